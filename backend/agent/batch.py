@@ -0,0 +1,248 @@
+import asyncio
+import codecs
+import logging
+import math
+import time
+import uuid
+from typing import AsyncIterator
+from pydantic import ValidationError
+from agent.vea import VeaAgent, count_tool_iterations, turn_usage
+from models.chat import BatchItem
+from utils.admission import PRIORITIES, AdmissionRejected
+from utils.image_store import get_image_store
+
+
+logger = logging.getLogger("backend.agent.batch")
+
+# a saturated model is retried after its Retry-After hint before the item fails
+MAX_ADMISSION_ATTEMPTS = 5
+
+# a parsed line, None for blank lines and those before the offset
+BatchEntry = BatchItem | ValidationError | None
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of unsorted values."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Splits a UTF-8 byte stream into lines as it arrives.
+
+    Raises UnicodeDecodeError for bytes that are not UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    # pieces of the current line, a line with an image spans many chunks
+    pieces: list[str] = []
+    async for chunk in chunks:
+        *complete, rest = decoder.decode(chunk).split("\n")
+        for line in complete:
+            pieces.append(line)
+            yield "".join(pieces)
+            pieces = []
+        pieces.append(rest)
+    pieces.append(decoder.decode(b"", final=True))
+    if any(pieces):
+        yield "".join(pieces)
+
+
+def parse_line(line: str) -> BatchEntry:
+    if not line.strip():
+        return None
+    try:
+        return BatchItem.model_validate_json(line)
+    except ValidationError as e:
+        return e
+
+
+async def read_batch(chunks: AsyncIterator[bytes], offset: int = 0) -> list[BatchEntry]:
+    """Parses a JSONL byte stream one line at a time, skipping the lines before `offset`."""
+    entries: list[BatchEntry] = []
+    async for line in read_lines(chunks):
+        entries.append(parse_line(line) if len(entries) >= offset else None)
+    return entries
+
+
+def group_by_session(
+    entries: list[BatchEntry], offset: int
+) -> list[list[tuple[int, BatchItem | ValidationError]]]:
+    """Groups the entries from `offset` on by session, in the order of their first line.
+
+    Turns of one session build on each other, so a group runs one line after another.
+    Lines without a session, and invalid ones, are groups of their own.
+    """
+    groups: list[list[tuple[int, BatchItem | ValidationError]]] = []
+    sessions: dict[str, list[tuple[int, BatchItem | ValidationError]]] = {}
+    for index, entry in enumerate(entries):
+        if index < offset or entry is None:
+            continue
+        session_id = entry.session_id if isinstance(entry, BatchItem) else None
+        if session_id is None:
+            groups.append([(index, entry)])
+        elif session_id in sessions:
+            sessions[session_id].append((index, entry))
+        else:
+            sessions[session_id] = [(index, entry)]
+            groups.append(sessions[session_id])
+    return groups
+
+
+async def wait_for_admission(agent: VeaAgent, item: BatchItem, priority: int) -> None:
+    """Waits until the model answering the item would take it, nothing is written before."""
+    admission = agent.admission(vision=bool(item.image_data or item.image_id))
+    for attempt in range(1, MAX_ADMISSION_ATTEMPTS + 1):
+        try:
+            admission.check(priority)
+            return
+        except AdmissionRejected as e:
+            if attempt == MAX_ADMISSION_ATTEMPTS:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+
+async def run_item(
+    agent: VeaAgent,
+    batch_id: str,
+    index: int,
+    item: BatchItem | ValidationError,
+    priority: int,
+) -> dict:
+    """Runs one batch line as a turn, failures are reported in the result instead of raised."""
+    result = {"type": "result", "index": index, "id": str(index)}
+    if isinstance(item, ValidationError):
+        problems = "; ".join(
+            f"{'.'.join(map(str, error['loc'])) or 'line'}: {error['msg']}"
+            for error in item.errors()
+        )
+        return {**result, "status": "error", "error": f"Invalid item: {problems}"}
+    if item.id is not None:
+        result["id"] = item.id
+    if item.image_id and not get_image_store().exists(item.image_id):
+        return {**result, "status": "error", "error": f"Image {item.image_id} not found"}
+
+    session_id = item.session_id or f"batch-{batch_id}-{index}"
+    start = time.perf_counter()
+    try:
+        await wait_for_admission(agent, item, priority)
+        response = await agent.query(
+            item.query,
+            session_id,
+            item.image_data,
+            item.image_id,
+            priority=priority,
+            endpoint="batch",
+        )
+        state = await agent.graph.aget_state(agent.get_config(session_id))
+        messages = state.values["messages"]
+        usage = turn_usage(messages)
+        return {
+            **result,
+            "status": "ok",
+            "sessionId": item.session_id,
+            "response": response,
+            "latencyMs": round((time.perf_counter() - start) * 1000, 1),
+            "tokens": {"input": usage["input_tokens"], "output": usage["output_tokens"]},
+            "toolIterations": count_tool_iterations(messages),
+        }
+    except Exception as e:
+        logger.warning("Batch %s item %d failed: %r", batch_id, index, e)
+        return {
+            **result,
+            "status": "error",
+            "sessionId": item.session_id,
+            "error": str(e),
+            "latencyMs": round((time.perf_counter() - start) * 1000, 1),
+        }
+    finally:
+        if item.session_id is None:
+            # isolated threads are never read again
+            agent.memory.delete_thread(session_id)
+
+
+async def run_batch(
+    agent: VeaAgent,
+    entries: list[BatchEntry],
+    offset: int = 0,
+    concurrency: int = 4,
+    priority: int = PRIORITIES["low"],
+) -> AsyncIterator[dict]:
+    """Runs the parsed JSONL lines from `offset` on with bounded concurrency.
+
+    Lines of the same session run one after another in line order, the others run
+    in parallel. Yields a result per item as it finishes, so results arrive out of
+    order. Each carries the absolute line index and a `resumeOffset`, the first line
+    that hasn't finished yet, to restart an interrupted batch without repeating
+    finished items. A summary with latency and token totals ends the batch. Closing
+    the iterator cancels the running items.
+    """
+    batch_id = uuid.uuid4().hex[:12]
+    pending = iter(group_by_session(entries, offset))
+    finished = {index for index, entry in enumerate(entries) if entry is None}
+    resume_offset = offset
+    results: asyncio.Queue = asyncio.Queue()
+    logger.info(
+        "Starting batch %s: %d lines from offset %d, concurrency %d",
+        batch_id,
+        len(entries),
+        offset,
+        concurrency,
+    )
+
+    async def worker() -> None:
+        # workers share the iterator, each takes the next session when it's free
+        for group in pending:
+            for index, item in group:
+                result = await run_item(agent, batch_id, index, item, priority)
+                await results.put(result)
+
+    start = time.perf_counter()
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    remaining = asyncio.ensure_future(asyncio.gather(*workers))
+    latencies = []
+    tokens = {"input": 0, "output": 0}
+    counts = {"ok": 0, "error": 0}
+    try:
+        while not (remaining.done() and results.empty()):
+            getter = asyncio.ensure_future(results.get())
+            await asyncio.wait({getter, remaining}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                # a failed worker ends the batch, items report their own errors
+                remaining.result()
+                continue
+
+            result = getter.result()
+            finished.add(result["index"])
+            while resume_offset in finished:
+                resume_offset += 1
+            counts[result["status"]] += 1
+            if "latencyMs" in result:
+                latencies.append(result["latencyMs"])
+            for key, value in result.get("tokens", {}).items():
+                tokens[key] += value
+            yield {**result, "resumeOffset": resume_offset}
+    finally:
+        for task in workers:
+            task.cancel()
+        # waits without forwarding another cancellation into the items' cleanup
+        await asyncio.wait(workers)
+
+    summary = {
+        "type": "summary",
+        "batchId": batch_id,
+        "items": counts["ok"] + counts["error"],
+        "ok": counts["ok"],
+        "errors": counts["error"],
+        "durationMs": round((time.perf_counter() - start) * 1000, 1),
+        "tokens": tokens,
+        "resumeOffset": len(entries),
+    }
+    if latencies:
+        summary["latencyMs"] = {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": max(latencies),
+        }
+    logger.info("Finished batch %s: %s", batch_id, summary)
+    yield summary
@@ -1,24 +1,117 @@
+import functools
 import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from agent.llm_cache import LLMResponseCache
+from agent.memory import BoundedMemorySaver
 from agent.vea import VeaAgent
-from utils.config import read_config
+from utils.config import (
+    read_config,
+    read_history_config,
+    read_llm_cache_config,
+    read_memory_config,
+    read_ollama_config,
+    read_routing_config,
+    read_tool_execution_config,
+    read_tool_llm_config,
+    read_vision_llm_config,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# agents built for recent configurations, switching back to one of them is instant
+MAX_CACHED_AGENTS = 8
+_agent_cache: OrderedDict[tuple, VeaAgent] = OrderedDict()
+_agent_cache_lock = threading.Lock()
+
+
+@functools.cache
+def get_checkpointer() -> BoundedMemorySaver:
+    """Returns the conversation store shared by every agent, so conversations survive reconfiguration"""
+    memory_config = read_memory_config()
+    max_bytes = (
+        int(memory_config.max_megabytes * 1024 * 1024)
+        if memory_config.max_megabytes
+        else None
+    )
+    return BoundedMemorySaver(
+        max_checkpoints=memory_config.max_checkpoints_per_thread,
+        idle_ttl_seconds=memory_config.idle_ttl_seconds,
+        max_bytes=max_bytes,
+        strip_images=memory_config.strip_images,
+    )
+
+
+@functools.cache
+def get_llm_cache() -> LLMResponseCache | None:
+    """Returns the LLM response cache shared by every agent, or None when it's turned off"""
+    config = read_llm_cache_config()
+    if config.mode == "off":
+        return None
+    return LLMResponseCache(
+        Path(config.path), max_bytes=int(config.max_megabytes * 1024 * 1024)
+    )
+
 
 def create_vea_agent():
-    """Creates an instance of Vea Agent"""
-    logger.info("Creating Vea agent")
+    """Returns a Vea Agent for the current configuration.
+
+    Agents (bound LLMs and compiled graphs) are cached by configuration and all share
+    one checkpointer, so switching models or tools keeps every conversation.
+    """
     config = read_config()
 
     tools = config.tools_config
     enabled_tools = [tool for tool, enabled in tools.items() if enabled]
-    logger.info("Enabled tools: %s", enabled_tools)
+    history_config = read_history_config()
+    vision_config = read_vision_llm_config()
+    tool_execution_config = read_tool_execution_config()
+    llm_cache_config = read_llm_cache_config()
+    routing_config = read_routing_config()
+    tool_llm_config = read_tool_llm_config()
+    ollama_config = read_ollama_config()
 
-    agent = VeaAgent(
-        tool_model_name=config.tool_model,
-        vision_model_name=config.image_model,
-        enabled_tools=enabled_tools,
+    key = (
+        config.tool_model,
+        config.image_model,
+        tuple(sorted(enabled_tools)),
+        history_config.model_dump_json(),
+        vision_config.model_dump_json(),
+        tool_execution_config.model_dump_json(),
+        llm_cache_config.mode,
+        routing_config.model_dump_json(),
+        tool_llm_config.model_dump_json(),
+        ollama_config.model_dump_json(),
     )
+
+    with _agent_cache_lock:
+        if key in _agent_cache:
+            logger.info("Reusing cached Vea agent for %s", key[:3])
+            _agent_cache.move_to_end(key)
+            return _agent_cache[key]
+
+        logger.info("Creating Vea agent")
+        logger.info("Enabled tools: %s", enabled_tools)
+        agent = VeaAgent(
+            tool_model_name=config.tool_model,
+            vision_model_name=config.image_model,
+            enabled_tools=enabled_tools,
+            checkpointer=get_checkpointer(),
+            history_config=history_config,
+            vision_config=vision_config,
+            tool_execution_config=tool_execution_config,
+            llm_cache=get_llm_cache(),
+            llm_cache_config=llm_cache_config,
+            routing_config=routing_config,
+            tool_llm_config=tool_llm_config,
+            ollama_config=ollama_config,
+        )
+
+        _agent_cache[key] = agent
+        while len(_agent_cache) > MAX_CACHED_AGENTS:
+            _agent_cache.popitem(last=False)
+
     logger.info("Vea agent created successfully")
     return agent
@@ -0,0 +1,35 @@
+"""Renders the LangGraph workflow diagram.
+
+Rendering goes through a remote Mermaid service, so it is kept off the server's
+startup and request paths. Run it from the backend directory:
+
+    python -m agent.diagram [output_path]
+"""
+import logging
+import sys
+from agent.create import create_vea_agent
+
+
+logger = logging.getLogger("backend.agent.diagram")
+
+DIAGRAM_OUTPUT_PATH = "diagrams/langgraph_workflow.png"
+
+
+def save_workflow_diagram(output_path: str = DIAGRAM_OUTPUT_PATH) -> None:
+    """Builds the agent for the current config and saves its workflow graph as a PNG."""
+    agent = create_vea_agent()
+
+    logger.info("Generating workflow diagram at %s", output_path)
+    img_bytes = agent.graph.get_graph().draw_mermaid_png()
+
+    with open(output_path, "wb") as f:
+        f.write(img_bytes)
+    logger.info("Workflow diagram saved successfully")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    save_workflow_diagram(*sys.argv[1:2])
@@ -0,0 +1,167 @@
+import json
+import logging
+import time
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langgraph.constants import TAG_NOSTREAM
+from utils.admission import PRIORITIES, get_admission_controller
+from utils.metrics import LLM_LATENCY, observe_usage
+
+
+# Configure logger
+logger = logging.getLogger("backend.agent.history")
+
+# rough average for English text with BPE tokenizers, good enough for budgeting
+CHARS_PER_TOKEN = 4
+# role markers and template tokens added around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and Vea, an AI assistant. "
+    "Update the existing summary with the new messages. Keep facts, names, numbers, user preferences, "
+    "open questions and results of tool calls that later turns may refer to. "
+    "Be concise and write the summary as plain prose without preamble."
+)
+
+
+def estimate_tokens(message: AnyMessage | dict) -> int:
+    """Cheap local token estimate for a message, no tokenizer round trip."""
+    if isinstance(message, dict):
+        content = message.get("content", "")
+        tool_calls = message.get("tool_calls", [])
+    else:
+        content = message.content
+        tool_calls = getattr(message, "tool_calls", [])
+
+    if not isinstance(content, str):
+        content = json.dumps(content, default=str)
+    chars = len(content)
+    for tool_call in tool_calls:
+        chars += len(tool_call["name"]) + len(json.dumps(tool_call["args"], default=str))
+
+    return chars // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_history_tokens(messages: list) -> int:
+    return sum(estimate_tokens(message) for message in messages)
+
+
+def format_transcript(messages: list[AnyMessage]) -> str:
+    """Renders messages as a plain transcript for the summarizer."""
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {message.content}")
+        elif isinstance(message, AIMessage):
+            if message.content:
+                lines.append(f"Vea: {message.content}")
+            for tool_call in message.tool_calls:
+                lines.append(
+                    f"Vea called {tool_call['name']}({json.dumps(tool_call['args'], default=str)})"
+                )
+        elif isinstance(message, ToolMessage):
+            lines.append(f"Tool {message.name} returned: {message.content}")
+    return "\n".join(lines)
+
+
+class HistoryManager:
+    """Keeps the prompt history of a conversation within a token budget.
+
+    Messages that no longer fit are folded into a rolling summary. The summary and the
+    index of the first unsummarized message live in graph state, so each message is
+    summarized once instead of on every turn. Cuts are only made right before a user
+    message, which keeps tool-call/tool-result pairs together. Summaries are generated
+    at low priority through the model's admission controller, like any other call.
+    """
+
+    def __init__(
+        self,
+        summarizer: BaseChatModel,
+        model_name: str,
+        max_tokens: int = 8192,
+        recent_ratio: float = 0.5,
+        summary_max_tokens: int = 512,
+    ):
+        self.summarizer = summarizer
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.recent_ratio = recent_ratio
+        self.summary_max_tokens = summary_max_tokens
+
+    async def window(self, state, reserved_tokens: int = 0) -> tuple[list, dict]:
+        """Returns the messages to send and a state update with the new summary, if any.
+
+        `reserved_tokens` accounts for what is sent alongside the history, such as the system prompt.
+        """
+        messages = state["messages"]
+        summary = state.get("summary") or ""
+        start = state.get("summarized_until") or 0
+        window = messages[start:]
+
+        budget = self.max_tokens - reserved_tokens - self.summary_max_tokens
+        if estimate_history_tokens(window) <= budget:
+            return self._with_summary(summary, window), {}
+
+        cut = self._find_cut(window, int(budget * self.recent_ratio))
+        if cut == 0:
+            logger.warning(
+                "Current turn alone exceeds the history budget of %d tokens", budget
+            )
+            return self._with_summary(summary, window), {}
+
+        logger.info(
+            "Summarizing %d messages, history over budget of %d tokens", cut, budget
+        )
+        summary = await self._summarize(summary, window[:cut])
+        update = {"summary": summary, "summarized_until": start + cut}
+        return self._with_summary(summary, window[cut:]), update
+
+    def _find_cut(self, window: list, target: int) -> int:
+        """Returns the index of the earliest user message such that everything from it fits the target.
+
+        Falls back to the last user message, the current turn is never summarized.
+        """
+        last_human = 0
+        for index, message in enumerate(window):
+            if isinstance(message, HumanMessage):
+                last_human = index
+
+        tokens = 0
+        cut = last_human
+        for index in range(len(window) - 1, -1, -1):
+            tokens += estimate_tokens(window[index])
+            if tokens > target:
+                break
+            if isinstance(window[index], HumanMessage):
+                cut = index
+        return min(cut, last_human)
+
+    async def _summarize(self, summary: str, messages: list[AnyMessage]) -> str:
+        content = (
+            f"Existing summary:\n{summary or '(none)'}\n\n"
+            f"New messages:\n{format_transcript(messages)}\n\n"
+            f"Keep the updated summary under {self.summary_max_tokens * 3 // 4} words."
+        )
+        # the turn waits for its summary, but a summary can wait behind other turns
+        async with get_admission_controller(self.model_name).admit(PRIORITIES["low"]):
+            start = time.perf_counter()
+            response = await self.summarizer.ainvoke(
+                [SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=content)],
+                config={"tags": [TAG_NOSTREAM]},
+            )
+        LLM_LATENCY.labels(self.model_name, "summary").observe(time.perf_counter() - start)
+        observe_usage(self.model_name, response.usage_metadata)
+        return response.text()
+
+    def _with_summary(self, summary: str, messages: list) -> list:
+        if not summary:
+            return list(messages)
+        return [
+            SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")
+        ] + list(messages)
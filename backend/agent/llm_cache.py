@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Sequence
+from langchain_core.load import dumpd, load
+from langchain_core.messages import AIMessage, BaseMessage, convert_to_messages
+
+
+logger = logging.getLogger("backend.agent.llm_cache")
+
+
+def _message_key(message: BaseMessage) -> dict[str, Any]:
+    """The parts of a message the model sees, ids and response metadata change on every run."""
+    key: dict[str, Any] = {"type": message.type, "content": message.content}
+    if isinstance(message, AIMessage) and message.tool_calls:
+        key["tool_calls"] = [
+            {"name": call["name"], "args": call["args"], "id": call["id"]}
+            for call in message.tool_calls
+        ]
+    for attribute in ("tool_call_id", "name"):
+        if getattr(message, attribute, None):
+            key[attribute] = getattr(message, attribute)
+    return key
+
+
+def cache_key(
+    model: str,
+    params: dict[str, Any],
+    tool_schemas: Sequence[dict],
+    messages: Sequence[Any],
+    day: str | None = None,
+) -> str:
+    """Hashes everything that determines the response: model, sampling params, tools and prompt.
+
+    `day` is the date the prompt is answered on, so answers that depend on it, e.g.
+    to "what's the weather today", aren't replayed on later days.
+    """
+    payload = {
+        "model": model,
+        "params": params,
+        "tools": list(tool_schemas),
+        "messages": [_message_key(m) for m in convert_to_messages(messages)],
+        "day": day,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """On-disk cache of model responses in SQLite.
+
+    Entries are evicted least recently used first once their total size exceeds
+    `max_bytes`. Methods block on disk I/O, call them from a worker thread.
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._conn.commit()
+        (self._total_bytes,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> AIMessage | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return load(json.loads(row[0]))
+
+    def set(self, key: str, message: AIMessage) -> None:
+        value = json.dumps(dumpd(message))
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._total_bytes += size - (row[0] if row else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self._total_bytes -= row[1]
+            self.evictions += 1
+
+    def record_bypass(self) -> None:
+        self.bypassed += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
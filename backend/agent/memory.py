@@ -0,0 +1,252 @@
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Sequence
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.constants import START
+
+
+# Configure logger
+logger = logging.getLogger("backend.agent.memory")
+
+# channels holding image payloads, only needed for the turn that carries them
+IMAGE_CHANNELS = ("image_data",)
+
+
+def _strip_image_value(channel: str, value: Any) -> Any:
+    """Drops image payloads from a channel value, including the raw graph input."""
+    if channel in IMAGE_CHANNELS:
+        return None
+    if channel == START and isinstance(value, dict):
+        if any(value.get(key) for key in IMAGE_CHANNELS):
+            return {
+                key: None if key in IMAGE_CHANNELS else item
+                for key, item in value.items()
+            }
+    return value
+
+
+class BoundedMemorySaver(MemorySaver):
+    """In-process checkpointer with bounded memory usage.
+
+    MemorySaver keeps every checkpoint of every thread forever. This saver keeps only
+    the last `max_checkpoints` checkpoints per thread, evicts threads idle for longer
+    than `idle_ttl_seconds`, evicts least recently used threads once the stored bytes
+    exceed `max_bytes`, and drops image payloads before they are persisted.
+
+    Threads with a turn in progress, see `running`, are never evicted: the next
+    checkpoints only write the channels that changed, so an evicted thread would
+    resume with partial state.
+    """
+
+    def __init__(
+        self,
+        max_checkpoints: int = 10,
+        idle_ttl_seconds: float | None = 3600,
+        max_bytes: int | None = 256 * 1024 * 1024,
+        strip_images: bool = True,
+    ):
+        super().__init__()
+        if max_checkpoints < 1:
+            raise ValueError("max_checkpoints must be at least 1")
+
+        self.max_checkpoints = max_checkpoints
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_bytes = max_bytes
+        self.strip_images = strip_images
+
+        self._lock = threading.RLock()
+        # thread ID -> last access time, least recently used first
+        self._last_access: OrderedDict[str, float] = OrderedDict()
+        # (thread ID, checkpoint NS) -> checkpoint ID -> channel versions
+        self._channel_versions: dict[tuple[str, str], dict[str, ChannelVersions]] = {}
+        self._thread_bytes: dict[str, int] = {}
+        # thread ID -> turns in progress
+        self._running: Counter[str] = Counter()
+        self._total_bytes = 0
+        self.evictions = 0
+        self.pruned_checkpoints = 0
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            if thread_id in self._last_access:
+                self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+
+            if self.strip_images:
+                checkpoint = self._strip_image_values(checkpoint)
+
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            self._channel_versions.setdefault((thread_id, checkpoint_ns), {})[
+                checkpoint["id"]
+            ] = dict(checkpoint["channel_versions"])
+
+            self._touch(thread_id)
+            self._prune_checkpoints(thread_id, checkpoint_ns)
+            self._update_thread_bytes(thread_id)
+            self._evict(keep=thread_id)
+            return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with self._lock:
+            if self.strip_images:
+                writes = [
+                    (channel, _strip_image_value(channel, value))
+                    for channel, value in writes
+                ]
+            super().put_writes(config, writes, task_id, task_path)
+
+            thread_id = config["configurable"]["thread_id"]
+            self._touch(thread_id)
+            self._update_thread_bytes(thread_id)
+
+    @contextmanager
+    def running(self, thread_id: str) -> Iterator[None]:
+        """Marks a turn of the thread as in progress for the duration of the block."""
+        with self._lock:
+            self._running[thread_id] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._running[thread_id] -= 1
+                if not self._running[thread_id]:
+                    del self._running[thread_id]
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            super().delete_thread(thread_id)
+            self._last_access.pop(thread_id, None)
+            for key in [key for key in self._channel_versions if key[0] == thread_id]:
+                del self._channel_versions[key]
+            self._total_bytes -= self._thread_bytes.pop(thread_id, 0)
+
+    def stats(self) -> dict[str, int]:
+        """Returns the current thread count, stored bytes and eviction counters."""
+        with self._lock:
+            return {
+                "threads": len(self._last_access),
+                "checkpoints": sum(
+                    len(versions) for versions in self._channel_versions.values()
+                ),
+                "checkpoint_bytes": self._total_bytes,
+                "evictions": self.evictions,
+                "pruned_checkpoints": self.pruned_checkpoints,
+            }
+
+    def _strip_image_values(self, checkpoint: Checkpoint) -> Checkpoint:
+        stripped = checkpoint.copy()
+        stripped["channel_values"] = {
+            channel: _strip_image_value(channel, value)
+            for channel, value in checkpoint["channel_values"].items()
+        }
+        return stripped
+
+    def _touch(self, thread_id: str) -> None:
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+
+    def _prune_checkpoints(self, thread_id: str, checkpoint_ns: str) -> None:
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        excess = len(checkpoints) - self.max_checkpoints
+        if excess <= 0:
+            return
+
+        versions = self._channel_versions.get((thread_id, checkpoint_ns), {})
+        # checkpoint IDs are monotonic, the oldest sort first
+        removed = sorted(checkpoints)[:excess]
+        for checkpoint_id in removed:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+        removed_versions = [versions.pop(checkpoint_id, {}) for checkpoint_id in removed]
+        retained = {
+            (channel, version)
+            for channel_versions in versions.values()
+            for channel, version in channel_versions.items()
+        }
+        for channel_versions in removed_versions:
+            for channel, version in channel_versions.items():
+                if (channel, version) not in retained:
+                    self.blobs.pop((thread_id, checkpoint_ns, channel, version), None)
+
+        self.pruned_checkpoints += len(removed)
+
+    def _update_thread_bytes(self, thread_id: str) -> None:
+        size = 0
+        for checkpoint_ns, checkpoints in self.storage.get(thread_id, {}).items():
+            blob_keys = set()
+            for checkpoint_id, (checkpoint, metadata, _) in checkpoints.items():
+                size += len(checkpoint[1]) + len(metadata[1])
+                for write in self.writes.get(
+                    (thread_id, checkpoint_ns, checkpoint_id), {}
+                ).values():
+                    size += len(write[2][1])
+                versions = self._channel_versions.get((thread_id, checkpoint_ns), {})
+                for channel, version in versions.get(checkpoint_id, {}).items():
+                    blob_keys.add((thread_id, checkpoint_ns, channel, version))
+            for key in blob_keys:
+                if blob := self.blobs.get(key):
+                    size += len(blob[1])
+
+        self._total_bytes += size - self._thread_bytes.get(thread_id, 0)
+        self._thread_bytes[thread_id] = size
+
+    def _evict(self, keep: str) -> None:
+        if self.idle_ttl_seconds is not None:
+            deadline = time.monotonic() - self.idle_ttl_seconds
+            for thread_id, last_access in list(self._last_access.items()):
+                if last_access >= deadline:
+                    break
+                if self._evictable(thread_id, keep):
+                    logger.info("Evicting idle conversation thread %s", thread_id)
+                    self._evict_thread(thread_id)
+
+        if self.max_bytes is not None:
+            for thread_id in list(self._last_access):
+                if self._total_bytes <= self.max_bytes:
+                    break
+                if not self._evictable(thread_id, keep):
+                    continue
+                logger.info(
+                    "Evicting conversation thread %s, checkpoint memory over budget (%d > %d bytes)",
+                    thread_id,
+                    self._total_bytes,
+                    self.max_bytes,
+                )
+                self._evict_thread(thread_id)
+
+    def _evictable(self, thread_id: str, keep: str) -> bool:
+        # the thread being written and threads with a turn in progress stay
+        return thread_id != keep and thread_id not in self._running
+
+    def _evict_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+        self.evictions += 1
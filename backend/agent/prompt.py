@@ -0,0 +1,79 @@
+import datetime
+import logging
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from models.config import OllamaConfig
+
+
+# Configure logger
+logger = logging.getLogger("backend.agent.prompt")
+
+# Ollama reuses the KV cache for the longest prefix a prompt shares with the previous
+# one, so everything here must be byte-identical between requests: no dates, no ids.
+# Volatile context is attached to the user message it belongs to instead.
+SYSTEM_PROMPT = """You are Vea, a friendly and knowledgeable AI assistant. Respond in a warm, approachable, and helpful manner. Always provide clear, accurate, and thoughtfully presented answers. Use markdown formatting when it improves clarity, structure, or readability. Whenever the user asks about current events, recent scientific developments, or other time-sensitive topics (e.g., stock prices or market trends), use the web search tool to retrieve the most up-to-date information before replying.
+Each user message starts with the local date and time it was sent, in square brackets. Use it whenever the current date or time matters."""
+# where the send time of a user message is kept, it is never sent to the model as is
+SENT_AT_KEY = "sent_at"
+SENT_AT_FORMAT = "%Y-%m-%d %H:%M %Z (%A)"
+# Ollama's own default context window
+MIN_NUM_CTX = 2048
+
+
+def user_message(content: str, now: datetime.datetime | None = None) -> HumanMessage:
+    """Builds a user message stamped with the time it was sent."""
+    now = now or datetime.datetime.now().astimezone()
+    return HumanMessage(
+        content=content,
+        additional_kwargs={SENT_AT_KEY: now.strftime(SENT_AT_FORMAT)},
+    )
+
+
+def render_message(message: BaseMessage) -> BaseMessage:
+    """Prefixes a user message with its stored send time.
+
+    The time is fixed when the message is created, so earlier turns render the same
+    on every request and the prompt prefix stays reusable.
+    """
+    if not isinstance(message, HumanMessage) or not isinstance(message.content, str):
+        return message
+    sent_at = message.additional_kwargs.get(SENT_AT_KEY)
+    if not sent_at:
+        return message
+    return message.model_copy(update={"content": f"[{sent_at}] {message.content}"})
+
+
+def sent_on(messages: list) -> str | None:
+    """Returns the local date the latest user message was sent, e.g. "2026-01-05"."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            sent_at = message.additional_kwargs.get(SENT_AT_KEY)
+            # SENT_AT_FORMAT starts with the date
+            return sent_at.split(" ", 1)[0] if sent_at else None
+    return None
+
+
+def build_prompt(messages: list) -> list:
+    """Lays out a request: the stable system prompt first, then the rendered history.
+
+    Tool schemas are sent separately and placed right after the system prompt by the
+    chat template, so the two together form the prefix every request shares.
+    """
+    return [SystemMessage(content=SYSTEM_PROMPT)] + [
+        render_message(message) for message in messages
+    ]
+
+
+def context_window(history_max_tokens: int, config: OllamaConfig) -> int | None:
+    """Returns the num_ctx for a tool model whose prompts stay within `history_max_tokens`.
+
+    Ollama reloads a model whenever a request asks for another num_ctx, which drops
+    its KV cache, so every conversation and the summarizer share one size: the next
+    power of two fitting the longest prompt the history budget allows plus a response.
+    """
+    if config.num_ctx != "auto":
+        return config.num_ctx
+    needed = history_max_tokens + config.response_reserve_tokens
+    size = MIN_NUM_CTX
+    while size < needed:
+        size *= 2
+    return size
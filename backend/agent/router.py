@@ -0,0 +1,108 @@
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from agent.history import HistoryManager
+from agent.llm_cache import LLMResponseCache
+from models.config import RoutingRule
+from utils.metrics import ROUTE_LLM_LATENCY, ROUTE_TURNS
+
+
+logger = logging.getLogger("backend.agent.router")
+
+# the configured tool model with every enabled tool
+DEFAULT_ROUTE = "default"
+
+
+def keyword_pattern(keywords: list[str]) -> re.Pattern | None:
+    """Compiles keywords into one pattern matching words that start with any of them."""
+    if not keywords:
+        return None
+    return re.compile(
+        "|".join(rf"\b{re.escape(keyword)}" for keyword in keywords), re.IGNORECASE
+    )
+
+
+@dataclass
+class Route:
+    """A model with its own tool bindings that text turns can be sent to."""
+
+    name: str
+    model_name: str
+    llm: BaseChatModel
+    llm_with_tools: Runnable
+    tools: list[BaseTool]
+    # sent with every request, part of the LLM cache key and the prompt budget
+    tool_schemas: list[dict]
+    sampling_params: dict
+    reserved_tokens: int
+    history: HistoryManager | None = None
+    # set when the cache mode allows caching this route's answers
+    llm_cache: LLMResponseCache | None = None
+    turns: int = field(default=0, init=False)
+    llm_calls: int = field(default=0, init=False)
+    llm_seconds: float = field(default=0.0, init=False)
+
+    def record_llm_call(self, seconds: float) -> None:
+        self.llm_calls += 1
+        self.llm_seconds += seconds
+        ROUTE_LLM_LATENCY.labels(self.name).observe(seconds)
+
+
+class Router:
+    """Picks the route of a text turn from its user message with cheap heuristics.
+
+    Rules are checked in order and the first one matching the message wins, turns
+    matching no rule take the default route. A rule matches when every condition it
+    sets holds: the message is at most `max_chars` long, contains a word starting with
+    one of `keywords` and none starting with one of `exclude_keywords`, ignoring case.
+    """
+
+    def __init__(self, rules: list[RoutingRule], routes: dict[str, Route]):
+        self.rules = [
+            (rule, keyword_pattern(rule.keywords), keyword_pattern(rule.exclude_keywords))
+            for rule in rules
+            if rule.route in routes
+        ]
+        self.routes = routes
+
+    def classify(self, query: str) -> str:
+        for rule, keywords, exclude_keywords in self.rules:
+            if rule.max_chars is not None and len(query) > rule.max_chars:
+                continue
+            if keywords and not keywords.search(query):
+                continue
+            if exclude_keywords and exclude_keywords.search(query):
+                continue
+            return rule.route
+        return DEFAULT_ROUTE
+
+    def route(self, query: str) -> Route:
+        """Classifies the turn and counts it for its route."""
+        start = time.perf_counter()
+        route = self.routes[self.classify(query)]
+        route.turns += 1
+        ROUTE_TURNS.labels(route.name).inc()
+        logger.info(
+            "Routed turn to %s (%s) in %.2fms",
+            route.name,
+            route.model_name,
+            (time.perf_counter() - start) * 1000,
+        )
+        return route
+
+    def stats(self) -> dict[str, dict[str, int | float | str]]:
+        return {
+            name: {
+                "model": route.model_name,
+                "turns": route.turns,
+                "llm_calls": route.llm_calls,
+                "avg_llm_seconds": round(route.llm_seconds / route.llm_calls, 3)
+                if route.llm_calls
+                else 0.0,
+            }
+            for name, route in self.routes.items()
+        }
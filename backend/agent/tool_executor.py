@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Sequence
+from langchain_core.messages import AIMessage, ToolCall, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from models.config import ToolExecutionConfig
+from tools.projection import project_tool_message
+from utils.metrics import QUEUE_WAIT, TOOL_CALLS, TOOL_LATENCY
+
+
+logger = logging.getLogger("backend.agent.tool_executor")
+
+# per-tool limit on concurrent calls, shared by every agent and conversation
+_tool_semaphores: dict[str, tuple[int, asyncio.Semaphore]] = {}
+
+
+def get_tool_semaphore(tool_name: str, max_concurrency: int) -> asyncio.Semaphore:
+    """Returns the semaphore bounding concurrent calls of the tool."""
+    limit, semaphore = _tool_semaphores.get(tool_name, (None, None))
+    if limit != max_concurrency:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        _tool_semaphores[tool_name] = (max_concurrency, semaphore)
+    return semaphore
+
+
+def error_message(tool_call: ToolCall, error: str, detail: str, **extra: Any) -> ToolMessage:
+    """Builds a structured error result, so the model can answer with what did succeed."""
+    content = {"error": error, "detail": detail, "tool": tool_call["name"], **extra}
+    return ToolMessage(
+        content=json.dumps(content),
+        name=tool_call["name"],
+        tool_call_id=tool_call["id"],
+        status="error",
+    )
+
+
+class ToolExecutor:
+    """Graph node running the tool calls of the last AI message concurrently.
+
+    Each call has its own timeout and waits for a slot of its tool's concurrency limit,
+    and all calls of a message share a deadline after which pending calls are cancelled.
+    A call that fails, times out or is cancelled yields an error ToolMessage instead of
+    failing the turn, so the model always gets one result per tool call.
+    """
+
+    def __init__(self, tools: Sequence[BaseTool], config: ToolExecutionConfig | None = None):
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.config = config or ToolExecutionConfig()
+
+    async def __call__(self, state: dict, config: RunnableConfig) -> dict:
+        message = state["messages"][-1]
+        if not isinstance(message, AIMessage) or not message.tool_calls:
+            return {"messages": []}
+
+        tool_calls = message.tool_calls
+        logger.info(
+            "Running %d tool calls: %s",
+            len(tool_calls),
+            [tool_call["name"] for tool_call in tool_calls],
+        )
+        tasks = [
+            asyncio.create_task(self.run_tool_call(tool_call, config))
+            for tool_call in tool_calls
+        ]
+
+        try:
+            _, pending = await asyncio.wait(
+                tasks, timeout=self.config.turn_timeout_seconds
+            )
+        finally:
+            # also reached when the turn itself is cancelled
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        messages = []
+        for tool_call, task in zip(tool_calls, tasks):
+            if task in pending:
+                TOOL_CALLS.labels(tool_call["name"], "cancelled").inc()
+                logger.warning(
+                    "Tool %s cancelled after the %ss turn deadline",
+                    tool_call["name"],
+                    self.config.turn_timeout_seconds,
+                )
+                messages.append(
+                    error_message(
+                        tool_call,
+                        "cancelled",
+                        "The tool did not finish before the deadline for this step.",
+                        timeout_seconds=self.config.turn_timeout_seconds,
+                    )
+                )
+            else:
+                messages.append(task.result())
+        return {"messages": messages}
+
+    async def run_tool_call(self, tool_call: ToolCall, config: RunnableConfig) -> ToolMessage:
+        name = tool_call["name"]
+        tool = self.tools_by_name.get(name)
+        if tool is None:
+            TOOL_CALLS.labels(name, "unknown_tool").inc()
+            return error_message(
+                tool_call,
+                "unknown_tool",
+                f"Tool {name!r} does not exist, choose one of {sorted(self.tools_by_name)}.",
+            )
+
+        timeout = self.config.timeout_for(name)
+        semaphore = get_tool_semaphore(name, self.config.max_concurrency_for(name))
+        start = time.perf_counter()
+        try:
+            # the timeout covers waiting for a free slot
+            async with asyncio.timeout(timeout):
+                async with semaphore:
+                    QUEUE_WAIT.labels(f"tool:{name}").observe(time.perf_counter() - start)
+                    result = await tool.ainvoke({**tool_call, "type": "tool_call"}, config)
+        except TimeoutError:
+            TOOL_CALLS.labels(name, "timeout").inc()
+            logger.warning("Tool %s timed out after %ss", name, timeout)
+            return error_message(
+                tool_call,
+                "timeout",
+                f"The tool did not respond within {timeout:g} seconds.",
+                timeout_seconds=timeout,
+            )
+        except Exception as e:
+            TOOL_CALLS.labels(name, "error").inc()
+            logger.exception("Tool %s failed", name)
+            return error_message(tool_call, "failed", f"{type(e).__name__}: {e}")
+        finally:
+            TOOL_LATENCY.labels(name).observe(time.perf_counter() - start)
+
+        logger.debug("Tool %s finished in %.3fs", name, time.perf_counter() - start)
+        if not isinstance(result, ToolMessage):
+            # tools returning a Command or raw value are not used here, wrap them like ToolNode would
+            result = ToolMessage(content=str(result), name=name, tool_call_id=tool_call["id"])
+        TOOL_CALLS.labels(name, result.status).inc()
+        return project_tool_message(result, tool_call, self.config)
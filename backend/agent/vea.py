@@ -1,22 +1,69 @@
+import asyncio
 import logging
-from typing import Annotated
+from contextlib import AbstractContextManager, aclosing, nullcontext
+from typing import Annotated, AsyncIterator
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode, tools_condition
+from langgraph.prebuilt import tools_condition
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.runnables import RunnableConfig
 from langchain.chat_models import init_chat_model
-from langchain_tavily import TavilySearch
+from langchain_core.tools import BaseTool
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
 from langsmith import traceable
-import os
 from dotenv import load_dotenv
 from tools import (
-    calculator,
-    trig_functions,
+    calculate,
     fetch_weather_data,
     use_vision_llm,
+    get_web_search_tool,
+)
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from agent.history import CHARS_PER_TOKEN, HistoryManager
+from agent.llm_cache import LLMResponseCache, cache_key
+from agent.memory import BoundedMemorySaver
+from agent.prompt import (
+    SYSTEM_PROMPT,
+    build_prompt,
+    context_window,
+    sent_on,
+    user_message,
+)
+from agent.router import DEFAULT_ROUTE, Route, Router
+from agent.tool_executor import ToolExecutor, error_message
+from models.config import (
+    HistoryConfig,
+    LLMCacheConfig,
+    OllamaConfig,
+    RoutingConfig,
+    ToolExecutionConfig,
+    ToolLLMConfig,
+    VisionLLMConfig,
+)
+from utils.admission import (
+    DEFAULT_PRIORITY,
+    AdmissionController,
+    get_admission_controller,
 )
-import datetime
+from utils.image_store import ImageStore, get_image_store
+from utils.metrics import (
+    CANCELLED_TURNS,
+    LLM_LATENCY,
+    TOOL_ITERATIONS,
+    observe_usage,
+    track_turn,
+)
+from utils.streaming import ThinkTagSplitter
+import json
+import time
 
 
 load_dotenv()
@@ -24,15 +71,57 @@ load_dotenv()
 # Configure logger
 logger = logging.getLogger("backend.agent")
 
-CURRENT_TIME = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-SYSTEM_PROMPT = f"""You are Vea, a friendly and knowledgeable AI assistant. Respond in a warm, approachable, and helpful manner. Always provide clear, accurate, and thoughtfully presented answers. Use markdown formatting when it improves clarity, structure, or readability. Whenever the user asks about current events, recent scientific developments, or other time-sensitive topics (e.g., stock prices or market trends), use the web search tool to retrieve the most up-to-date information before replying.
-Today's date is {CURRENT_TIME}"""
-DIAGRAM_OUTPUT_PATH = "diagrams/langgraph_workflow.png"
+DEFAULT_SESSION_ID = "default"
+CANCELLED_RESPONSE = "(This response was cancelled before it finished.)"
+# model attributes that change the response, part of the LLM cache key when present
+SAMPLING_PARAMS = (
+    "temperature",
+    "top_p",
+    "top_k",
+    "num_ctx",
+    "num_predict",
+    "max_tokens",
+    "seed",
+    "repeat_penalty",
+    "stop",
+    "format",
+    "reasoning",
+)
+
+
+def count_tool_iterations(messages: list) -> int:
+    """Counts the model responses with tool calls since the last user message."""
+    iterations = 0
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            break
+        if isinstance(message, AIMessage) and message.tool_calls:
+            iterations += 1
+    return iterations
+
+
+def turn_usage(messages: list) -> dict[str, int]:
+    """Sums the token usage of the model responses since the last user message."""
+    usage = {"input_tokens": 0, "output_tokens": 0}
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            break
+        if isinstance(message, AIMessage) and message.usage_metadata:
+            for key in usage:
+                usage[key] += message.usage_metadata.get(key, 0)
+    return usage
 
 
 class State(TypedDict):
     messages: Annotated[list, add_messages]
     image_data: str
+    # reference into the image store, preferred over inline image_data
+    image_id: str
+    # rolling summary of messages[:summarized_until], see agent.history
+    summary: str
+    summarized_until: int
+    # route picked for the current turn, see agent.router
+    route: str
 
 
 class VeaAgent:
@@ -40,8 +129,18 @@ class VeaAgent:
         self,
         tool_model_name,
         vision_model_name,
-        thread_id: str = "1",
         enabled_tools: list[str] = ["web_search", "weather", "math"],
+        checkpointer: BaseCheckpointSaver | None = None,
+        history_config: HistoryConfig | None = None,
+        vision_config: VisionLLMConfig | None = None,
+        image_store: ImageStore | None = None,
+        web_search: BaseTool | None = None,
+        tool_execution_config: ToolExecutionConfig | None = None,
+        llm_cache: LLMResponseCache | None = None,
+        llm_cache_config: LLMCacheConfig | None = None,
+        routing_config: RoutingConfig | None = None,
+        tool_llm_config: ToolLLMConfig | None = None,
+        ollama_config: OllamaConfig | None = None,
     ):
         logger.info(
             "Initializing VeaAgent with tool_model: %s, vision_model: %s",
@@ -50,63 +149,235 @@ class VeaAgent:
         )
         logger.info("Enabled tools: %s", enabled_tools)
 
-        self.memory = MemorySaver()
-        self.llm = init_chat_model(tool_model_name)
-        self.web_search = TavilySearch(
-            max_results=2, api_key=os.getenv("TAVILY_API_KEY")
-        )
+        self.memory = checkpointer or MemorySaver()
+        self.history_config = history_config or HistoryConfig()
+        self.ollama_config = ollama_config or OllamaConfig()
+        self.tool_model_name = tool_model_name
+        tool_llm_config = tool_llm_config or ToolLLMConfig()
+        self.llm = self.init_model(tool_model_name, tool_llm_config.temperature)
 
-        # we add tools based on the enabled_tools list
-        self.tools = []
+        # we add tools based on the enabled_tools list, keyed like the tools config
+        self.tools_by_key: dict[str, BaseTool] = {}
+        self.web_search = None
         if "web_search" in enabled_tools:
-            self.tools.append(self.web_search)
+            self.web_search = web_search or get_web_search_tool()
+            self.tools_by_key["web_search"] = self.web_search
             logger.debug("Added web search tool")
         if "weather" in enabled_tools:
-            self.tools.append(fetch_weather_data)
+            self.tools_by_key["weather"] = fetch_weather_data
             logger.debug("Added weather tool")
         if "math" in enabled_tools:
-            self.tools.append(calculator)
-            self.tools.append(trig_functions)
-            logger.debug("Added math tools")
+            self.tools_by_key["math"] = calculate
+            logger.debug("Added math tool")
+        self.tools = list(self.tools_by_key.values())
 
-        self.llm_with_tools = self.llm.bind_tools(self.tools)
+        self.tool_execution_config = tool_execution_config or ToolExecutionConfig()
         self.vision_model_name = vision_model_name
+        self.vision_config = vision_config or VisionLLMConfig()
+        self.image_store = image_store or get_image_store()
+
+        self.llm_cache = llm_cache
+        self.llm_cache_config = llm_cache_config or LLMCacheConfig()
+
+        self.routes = {
+            DEFAULT_ROUTE: self.build_route(
+                DEFAULT_ROUTE, tool_model_name, self.tools, self.llm
+            )
+        }
+        self.router = None
+        routing_config = routing_config or RoutingConfig()
+        if routing_config.enabled and routing_config.routes:
+            for name, route_config in routing_config.routes.items():
+                tools = self.tools
+                if route_config.tools is not None:
+                    # tools disabled in the tools section stay off on every route
+                    tools = [
+                        self.tools_by_key[key]
+                        for key in route_config.tools
+                        if key in self.tools_by_key
+                    ]
+                llm = self.init_model(route_config.model, route_config.temperature)
+                self.routes[name] = self.build_route(name, route_config.model, tools, llm)
+            self.router = Router(routing_config.rules, self.routes)
+            logger.info("Routing enabled with routes %s", list(self.routes))
 
-        self.config = {"configurable": {"thread_id": thread_id}}
         self.graph = self._build_graph()
 
-        # save a workflow graph, you can comment this out if you don't want to save the graph
-        if not os.path.exists(DIAGRAM_OUTPUT_PATH):
-            logger.info("Generating workflow diagram at %s", DIAGRAM_OUTPUT_PATH)
-            img_bytes = self.graph.get_graph().draw_mermaid_png()
+    def init_model(self, model_name: str, temperature: float | None = None):
+        """Initializes a tool model, Ollama models get the keep_alive and context window.
+
+        Both stay the same for every request, so Ollama keeps the model and its KV cache
+        loaded between turns.
+        """
+        params = {}
+        if temperature is not None:
+            params["temperature"] = temperature
+        if model_name.startswith("ollama:"):
+            params["keep_alive"] = self.ollama_config.keep_alive
+            num_ctx = context_window(
+                self.history_config.max_tokens_for(model_name), self.ollama_config
+            )
+            if num_ctx is not None:
+                params["num_ctx"] = num_ctx
+        logger.debug("Initializing %s with %s", model_name, params)
+        return init_chat_model(model_name, **params)
+
+    def build_route(
+        self, name: str, model_name: str, tools: list[BaseTool], llm
+    ) -> Route:
+        """Binds the tools to the model and derives what its requests depend on."""
+        # the system prompt and tool schemas are sent with every request
+        tool_schemas = [convert_to_openai_tool(t) for t in tools]
+        sampling_params = {
+            param: getattr(llm, param)
+            for param in SAMPLING_PARAMS
+            if getattr(llm, param, None) is not None
+        }
+        history = None
+        if self.history_config.enabled:
+            history = HistoryManager(
+                llm,
+                model_name,
+                max_tokens=self.history_config.max_tokens_for(model_name),
+                recent_ratio=self.history_config.recent_ratio,
+                summary_max_tokens=self.history_config.summary_max_tokens,
+            )
 
-            with open(DIAGRAM_OUTPUT_PATH, "wb") as f:
-                f.write(img_bytes)
-            logger.info("Workflow diagram saved successfully")
+        # sampled answers differ between runs, only cache them when asked to
+        mode = self.llm_cache_config.mode
+        llm_cache = None
+        if self.llm_cache is not None and (
+            mode == "always"
+            or (mode == "deterministic" and sampling_params.get("temperature") == 0)
+        ):
+            llm_cache = self.llm_cache
+            logger.info("LLM response cache enabled for route %s (%s)", name, mode)
 
-    async def chatbot(self, state: State):
-        logger.debug("Processing chatbot state: %s", state)
-        if not state["image_data"]:
+        return Route(
+            name=name,
+            model_name=model_name,
+            llm=llm,
+            llm_with_tools=llm.bind_tools(tools),
+            tools=tools,
+            tool_schemas=tool_schemas,
+            sampling_params=sampling_params,
+            reserved_tokens=(len(SYSTEM_PROMPT) + len(json.dumps(tool_schemas)))
+            // CHARS_PER_TOKEN,
+            history=history,
+            llm_cache=llm_cache,
+        )
+
+    async def route_turn(self, state: State) -> dict:
+        """Graph node picking the route of a text turn, image turns go to the vision model."""
+        if state["image_data"] or state.get("image_id"):
+            return {"route": DEFAULT_ROUTE}
+        return {"route": self.router.route(self.extract_query_from_state(state)).name}
+
+    async def chatbot(self, state: State, config: RunnableConfig):
+        logger.debug(
+            "Processing chatbot state with %d messages", len(state["messages"])
+        )
+        if not state["image_data"] and not state.get("image_id"):
             logger.info("Processing text-based query")
-            message = await self.llm_with_tools.ainvoke(
-                self.preprend_system_prompt(state)
+            # a route from an agent with other routing settings falls back to the default
+            route = self.routes.get(state.get("route"), self.routes[DEFAULT_ROUTE])
+            messages, history_update = await self.window_history(state, route)
+            configurable = config.get("configurable", {})
+            message = await self.invoke_llm(
+                route,
+                messages,
+                configurable.get("bypass_llm_cache", False),
+                configurable.get("priority", DEFAULT_PRIORITY),
             )
             logger.debug("LLM response generated")
-            return {"messages": [message]}
+            return {"messages": [message], **history_update}
 
         else:
             logger.info("Processing image-based query with vision LLM")
             query = self.extract_query_from_state(state)
-            message = await use_vision_llm.ainvoke(
+            image_data = state["image_data"]
+            if state.get("image_id"):
+                image_data = await asyncio.to_thread(
+                    self.image_store.read_base64, state["image_id"]
+                )
+            start = time.perf_counter()
+            response = await use_vision_llm.ainvoke(
                 {
                     "query": query,
-                    "image_data": state["image_data"],
+                    "image_data": image_data,
                     "model_name": self.vision_model_name,
+                    "temperature": self.vision_config.temperature,
+                    "timeout": self.vision_config.timeout_seconds,
+                    "max_concurrency": self.vision_config.max_concurrency,
+                    "priority": config.get("configurable", {}).get(
+                        "priority", DEFAULT_PRIORITY
+                    ),
                 }
             )
 
+            LLM_LATENCY.labels(self.vision_model_name, "vision").observe(
+                time.perf_counter() - start
+            )
             logger.debug("Vision LLM response generated")
-            return {"messages": [message], "image_data": None}
+            return {
+                "messages": [AIMessage(content=response)],
+                "image_data": None,
+                "image_id": None,
+            }
+
+    async def invoke_llm(
+        self,
+        route: Route,
+        messages: list,
+        bypass_cache: bool = False,
+        priority: int = DEFAULT_PRIORITY,
+    ) -> AIMessage:
+        """Calls the route's LLM on the history, answering from the LLM cache if enabled.
+
+        The cache key is built from the unrendered history and the day the latest user
+        message was sent, so the same turn asked a minute later hits while answers are
+        never replayed on another day. Bypassing skips the lookup but still stores the
+        fresh response.
+        """
+        prompt = build_prompt(messages)
+        llm_cache = route.llm_cache
+        if llm_cache is None:
+            return await self.generate(route, prompt, priority)
+
+        key = cache_key(
+            route.model_name,
+            route.sampling_params,
+            route.tool_schemas,
+            [SystemMessage(content=SYSTEM_PROMPT), *messages],
+            day=sent_on(messages),
+        )
+        if bypass_cache:
+            llm_cache.record_bypass()
+        else:
+            cached = await asyncio.to_thread(llm_cache.get, key)
+            if cached is not None:
+                logger.info("LLM cache hit for %s", key[:12])
+                # a fresh id, add_messages would otherwise replace the original message
+                cached.id = None
+                cached.response_metadata["llm_cache_hit"] = True
+                return cached
+
+        message = await self.generate(route, prompt, priority)
+        await asyncio.to_thread(llm_cache.set, key, message)
+        return message
+
+    async def generate(
+        self, route: Route, messages: list, priority: int = DEFAULT_PRIORITY
+    ) -> AIMessage:
+        """Calls the route's LLM once admitted, recording its latency and token usage."""
+        async with get_admission_controller(route.model_name).admit(priority):
+            start = time.perf_counter()
+            message = await route.llm_with_tools.ainvoke(messages)
+        elapsed = time.perf_counter() - start
+        LLM_LATENCY.labels(route.model_name, "tool").observe(elapsed)
+        route.record_llm_call(elapsed)
+        observe_usage(route.model_name, message.usage_metadata)
+        return message
 
     def extract_query_from_state(self, state):
         messages = state.get("messages", [])
@@ -118,38 +389,244 @@ class VeaAgent:
         logger.warning("No HumanMessage found in state")
         return ""
 
-    def preprend_system_prompt(self, state):
-        messages = state["messages"]
-        system_message = {
-            "role": "system",
-            "content": SYSTEM_PROMPT,
-        }
-        return [system_message] + messages
+    async def window_history(self, state, route: Route) -> tuple[list, dict]:
+        """Returns the history to send, bounded by the route model's token budget, and any summary update"""
+        if route.history is None:
+            return state["messages"], {}
+        return await route.history.window(state, reserved_tokens=route.reserved_tokens)
 
     def _build_graph(self):
         logger.info("Building LangGraph workflow")
         graph_builder = StateGraph(State)
         graph_builder.add_node("chatbot", self.chatbot)
-        tool_node = ToolNode(tools=self.tools)
-        graph_builder.add_node("tools", tool_node)
+        tool_executor = ToolExecutor(self.tools, self.tool_execution_config)
+        graph_builder.add_node("tools", tool_executor)
 
         graph_builder.add_conditional_edges("chatbot", tools_condition)
         graph_builder.add_edge("tools", "chatbot")
-        graph_builder.add_edge(START, "chatbot")
+        if self.router is not None:
+            # routes once per turn, tool results go back to the same model
+            graph_builder.add_node("router", self.route_turn)
+            graph_builder.add_edge(START, "router")
+            graph_builder.add_edge("router", "chatbot")
+        else:
+            graph_builder.add_edge(START, "chatbot")
 
         graph = graph_builder.compile(checkpointer=self.memory)
         logger.info("LangGraph workflow built successfully")
         return graph
 
-    @traceable
-    async def query(self, user_input: str) -> str:
-        logger.info("Processing user query: %s", user_input)
-        state = await self.graph.ainvoke(
-            {"messages": [{"role": "user", "content": user_input}]},
-            config=self.config,
-            debug=True,
+    async def recover_cancelled_turn(self, config: dict, endpoint: str) -> None:
+        """Leaves a cancelled turn's conversation consistent.
+
+        Cancellation can stop the graph between steps, leaving the user's message
+        unanswered or tool calls without results, with nodes still scheduled to run on
+        the next turn. Unanswered tool calls get a cancelled result and the turn ends
+        with a short AI message, written as the chatbot's output so nothing is pending.
+        """
+        CANCELLED_TURNS.labels(endpoint).inc()
+        state = await self.graph.aget_state(config)
+        if not state.next:
+            return
+
+        messages = state.values.get("messages", [])
+        answered = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+        update = []
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            if isinstance(message, AIMessage):
+                update.extend(
+                    error_message(tool_call, "cancelled", "The turn was cancelled.")
+                    for tool_call in message.tool_calls
+                    if tool_call["id"] not in answered
+                )
+        update.append(AIMessage(content=CANCELLED_RESPONSE))
+
+        await self.graph.aupdate_state(
+            config,
+            {"messages": update, "image_data": None, "image_id": None},
+            as_node="chatbot",
+        )
+        logger.info(
+            "Recovered cancelled turn for session %s, %d tool calls cancelled",
+            config["configurable"]["thread_id"],
+            len(update) - 1,
         )
 
+    def running(self, session_id: str) -> AbstractContextManager:
+        """Keeps the session's conversation from being evicted while a turn runs."""
+        if isinstance(self.memory, BoundedMemorySaver):
+            return self.memory.running(session_id)
+        return nullcontext()
+
+    def admission(self, vision: bool = False) -> AdmissionController:
+        """Returns the admission controller of the model answering text or image turns."""
+        if vision:
+            return get_admission_controller(
+                self.vision_model_name, self.vision_config.max_concurrency
+            )
+        return get_admission_controller(self.tool_model_name)
+
+    def get_config(
+        self,
+        session_id: str = DEFAULT_SESSION_ID,
+        bypass_cache: bool = False,
+        priority: int = DEFAULT_PRIORITY,
+    ) -> dict:
+        """Returns the per-call config, each session maps to its own checkpointer thread"""
+        return {
+            "configurable": {
+                "thread_id": session_id,
+                "bypass_llm_cache": bypass_cache,
+                "priority": priority,
+            }
+        }
+
+    def build_input(
+        self,
+        user_input: str,
+        image_data: str | None = None,
+        image_id: str | None = None,
+    ) -> dict:
+        """Builds the graph input, the image travels with the turn instead of being written to shared state"""
+        return {
+            # stamped with the send time here, so the prompt renders it the same on every turn
+            "messages": [user_message(user_input)],
+            "image_data": image_data or None,
+            "image_id": image_id or None,
+        }
+
+    @traceable
+    async def query(
+        self,
+        user_input: str,
+        session_id: str = DEFAULT_SESSION_ID,
+        image_data: str | None = None,
+        image_id: str | None = None,
+        bypass_cache: bool = False,
+        debug: bool = False,
+        priority: int = DEFAULT_PRIORITY,
+        endpoint: str = "chat",
+    ) -> str:
+        """Runs a turn and returns the response, `debug` prints every graph step to stdout.
+
+        `endpoint` labels the turn's metrics.
+        """
+        logger.info("Processing user query for session %s: %s", session_id, user_input)
+        config = self.get_config(session_id, bypass_cache, priority)
+        with track_turn(endpoint), self.running(session_id):
+            try:
+                state = await self.graph.ainvoke(
+                    self.build_input(user_input, image_data, image_id),
+                    config=config,
+                    debug=debug,
+                )
+            except asyncio.CancelledError:
+                await asyncio.shield(self.recover_cancelled_turn(config, endpoint))
+                raise
+        TOOL_ITERATIONS.observe(count_tool_iterations(state["messages"]))
+
         response = state["messages"][-1].content
         logger.info("Query processed successfully, response length: %d", len(response))
         return response
+
+    def stream_events(
+        self, mode: str, chunk, splitter: ThinkTagSplitter
+    ) -> list[dict]:
+        """Translates one chunk of the graph's messages or updates stream into client events."""
+        events = []
+        if mode == "messages":
+            message, metadata = chunk
+            if metadata.get("langgraph_node") != "chatbot":
+                return events
+            if not isinstance(message, AIMessageChunk):
+                return events
+
+            reasoning = message.additional_kwargs.get("reasoning_content")
+            if reasoning:
+                events.append({"type": "thinking", "content": reasoning})
+            if isinstance(message.content, str) and message.content:
+                for kind, text in splitter.feed(message.content):
+                    events.append({"type": kind, "content": text})
+
+        elif mode == "updates":
+            for node, update in chunk.items():
+                if not update:
+                    continue
+                for message in update.get("messages", []):
+                    if (
+                        node == "chatbot"
+                        and isinstance(message, AIMessage)
+                        and message.response_metadata.get("llm_cache_hit")
+                        and isinstance(message.content, str)
+                    ):
+                        # cached responses don't go through the model, so nothing was streamed
+                        for kind, text in splitter.feed(message.content):
+                            events.append({"type": kind, "content": text})
+                    if node == "chatbot" and isinstance(message, AIMessage):
+                        for tool_call in message.tool_calls:
+                            events.append(
+                                {
+                                    "type": "tool_start",
+                                    "id": tool_call["id"],
+                                    "name": tool_call["name"],
+                                    "args": tool_call["args"],
+                                }
+                            )
+                    elif node == "tools" and isinstance(message, ToolMessage):
+                        events.append(
+                            {
+                                "type": "tool_end",
+                                "id": message.tool_call_id,
+                                "name": message.name,
+                                "status": message.status,
+                            }
+                        )
+        return events
+
+    async def stream_query(
+        self,
+        user_input: str,
+        session_id: str = DEFAULT_SESSION_ID,
+        image_data: str | None = None,
+        image_id: str | None = None,
+        bypass_cache: bool = False,
+        debug: bool = False,
+        priority: int = DEFAULT_PRIORITY,
+    ) -> AsyncIterator[dict]:
+        """Runs a turn and yields events as they happen.
+
+        Events are dicts with a "type" key: "token" and "thinking" carry LLM text,
+        "tool_start" and "tool_end" bracket tool calls, and "done" carries the final response.
+        """
+        logger.info("Streaming user query for session %s: %s", session_id, user_input)
+        config = self.get_config(session_id, bypass_cache, priority)
+        splitter = ThinkTagSplitter()
+
+        with track_turn("stream"), self.running(session_id):
+            try:
+                # closed before recovering, so no graph step runs after the recovery
+                async with aclosing(
+                    self.graph.astream(
+                        self.build_input(user_input, image_data, image_id),
+                        config=config,
+                        stream_mode=["messages", "updates"],
+                        debug=debug,
+                    )
+                ) as stream:
+                    async for mode, chunk in stream:
+                        for event in self.stream_events(mode, chunk, splitter):
+                            yield event
+
+                for kind, text in splitter.flush():
+                    yield {"type": kind, "content": text}
+            except (asyncio.CancelledError, GeneratorExit):
+                await asyncio.shield(self.recover_cancelled_turn(config, "stream"))
+                raise
+
+        state = await self.graph.aget_state(config)
+        TOOL_ITERATIONS.observe(count_tool_iterations(state.values["messages"]))
+        response = state.values["messages"][-1].content
+        logger.info("Streamed query completed, response length: %d", len(response))
+        yield {"type": "done", "content": response}
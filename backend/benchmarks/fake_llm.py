@@ -0,0 +1,154 @@
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, AsyncIterator, Iterator, Sequence
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+
+# keyword in the user query -> tool calls made before answering
+DEFAULT_TOOL_SCRIPTS: dict[str, list[dict[str, Any]]] = {
+    "weather": [
+        {"name": "fetch_weather_data", "args": {"city": "Cambridge", "country": "GB"}},
+        {"name": "fetch_weather_data", "args": {"city": "Boston", "country": "US", "state": "MA"}},
+    ],
+    "search": [{"name": "tavily_search", "args": {"query": "latest local llm benchmarks"}}],
+    "calculate": [
+        {
+            "name": "calculate",
+            "args": {
+                "expressions": ["rate = 0.05", "1000 * (1 + rate) ** years"],
+                "variables": {"years": [1, 5, 10]},
+            },
+        }
+    ],
+}
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model standing in for the Ollama models in benchmarks.
+
+    The first response to a user message makes the tool calls of the first script whose
+    keyword appears in the message, the next one answers with `answer_tokens` tokens.
+    Latency is `prompt_seconds` before the first token plus `1 / tokens_per_second` per token.
+    """
+
+    tokens_per_second: float = 200
+    prompt_seconds: float = 0.05
+    answer_tokens: int = 64
+    tool_scripts: dict[str, list[dict[str, Any]]] = Field(
+        default_factory=lambda: dict(DEFAULT_TOOL_SCRIPTS)
+    )
+    call_ids: Iterator[int] = Field(default_factory=itertools.count, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "benchmark-fake"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "FakeChatModel":
+        return self
+
+    def tool_calls_for(self, messages: list[BaseMessage]) -> list[dict[str, Any]]:
+        last = messages[-1]
+        if isinstance(last, ToolMessage) or last.type != "human":
+            return []
+        query = last.text().lower()
+        for keyword, calls in self.tool_scripts.items():
+            if keyword in query:
+                return [
+                    {**call, "id": f"call_{next(self.call_ids)}", "type": "tool_call"}
+                    for call in calls
+                ]
+        return []
+
+    def answer_tokens_for(self, messages: list[BaseMessage]) -> list[str]:
+        words = f"This is benchmark answer number {len(messages)} .".split()
+        return [f"{words[i % len(words)]} " for i in range(self.answer_tokens)]
+
+    def usage_for(self, messages: list[BaseMessage], tokens: list[str]) -> dict[str, int]:
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        return {
+            "input_tokens": prompt_tokens,
+            "output_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tool_calls = self.tool_calls_for(messages)
+        tokens = [] if tool_calls else self.answer_tokens_for(messages)
+        time.sleep(self.prompt_seconds + len(tokens) / self.tokens_per_second)
+        message = AIMessage(
+            content="".join(tokens),
+            tool_calls=tool_calls,
+            usage_metadata=self.usage_for(messages, tokens),
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tool_calls = self.tool_calls_for(messages)
+        tokens = [] if tool_calls else self.answer_tokens_for(messages)
+        await asyncio.sleep(self.prompt_seconds + len(tokens) / self.tokens_per_second)
+        message = AIMessage(
+            content="".join(tokens),
+            tool_calls=tool_calls,
+            usage_metadata=self.usage_for(messages, tokens),
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.prompt_seconds)
+        tool_calls = self.tool_calls_for(messages)
+        if tool_calls:
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": call["name"],
+                            "args": json.dumps(call["args"]),
+                            "id": call["id"],
+                            "index": i,
+                        }
+                        for i, call in enumerate(tool_calls)
+                    ],
+                    usage_metadata=self.usage_for(messages, []),
+                )
+            )
+            return
+
+        tokens = self.answer_tokens_for(messages)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            # like Ollama, usage arrives with the last chunk
+            usage = self.usage_for(messages, tokens) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(
+                message=AIMessageChunk(content=token, usage_metadata=usage)
+            )
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
@@ -0,0 +1,279 @@
+"""Offline load and latency benchmark for the chat endpoints.
+
+Serves the FastAPI app in-process and drives it over HTTP at a fixed concurrency, with a deterministic fake chat
+model in place of Ollama and stub weather and web search backends, so results only
+reflect Vea's own overhead. Run it from the backend directory:
+
+    python -m benchmarks.run --turns 1000 --concurrency 8
+    python -m benchmarks.run --endpoint chat --compare benchmarks/results/<baseline>.json
+
+Results are written as JSON to benchmarks/results/ unless --output is given.
+"""
+import argparse
+import asyncio
+import functools
+import gc
+import itertools
+import json
+import logging
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import httpx
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.stubs import StubWebSearch, weather_transport
+
+
+logger = logging.getLogger("backend.benchmarks")
+
+BENCHMARK_DIR = Path(__file__).parent
+RESULTS_DIR = BENCHMARK_DIR / "results"
+QUERIES = [
+    "What's the weather like in Cambridge and Boston?",
+    "Search for the latest news on local LLMs",
+    "Calculate the compound interest on 1000 at 5% for 1, 5 and 10 years",
+    "Tell me something interesting about octopuses",
+]
+# metrics where lower is better, used when comparing against a baseline
+COMPARED_METRICS = [
+    ("latency_ms", "p50"),
+    ("latency_ms", "p95"),
+    ("latency_ms", "p99"),
+    ("ttft_ms", "p50"),
+    ("ttft_ms", "p95"),
+    ("rss_growth_mb_per_1000_turns", None),
+]
+
+
+def current_rss_mb() -> float:
+    """Returns the resident set size of this process, falling back to the peak off Linux."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(values: list[float]) -> dict[str, float] | None:
+    if not values:
+        return None
+    if len(values) == 1:
+        return {k: round(values[0], 2) for k in ("p50", "p95", "p99", "mean", "max")}
+    percentiles = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "p50": round(percentiles[49], 2),
+        "p95": round(percentiles[94], 2),
+        "p99": round(percentiles[98], 2),
+        "mean": round(statistics.fmean(values), 2),
+        "max": round(max(values), 2),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def install_fakes(args: argparse.Namespace) -> None:
+    """Points the app at the benchmark config, the fake chat model and the stub tool backends."""
+    import agent.vea
+    import tools.weather
+    import utils.config
+    from tools.web_search import create_web_search_tool
+
+    utils.config.CONFIG_PATH = BENCHMARK_DIR / "agent.yaml"
+    utils.config.invalidate_config_cache()
+
+    agent.vea.init_chat_model = lambda *_, **__: FakeChatModel(
+        tokens_per_second=args.token_rate,
+        prompt_seconds=args.prompt_seconds,
+        answer_tokens=args.answer_tokens,
+    )
+    agent.vea.get_web_search_tool = functools.cache(
+        lambda: create_web_search_tool(
+            backend=StubWebSearch(latency_seconds=args.tool_latency)
+        )
+    )
+
+    os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+    tools.weather._client = httpx.AsyncClient(
+        transport=weather_transport(latency_seconds=args.tool_latency)
+    )
+
+
+async def chat_turn(client: httpx.AsyncClient, endpoint: str, body: dict) -> float | None:
+    """Sends one turn, returning the time to the first answer token for the streaming endpoint."""
+    if endpoint == "chat":
+        response = await client.post("/chat/", json=body)
+        response.raise_for_status()
+        return None
+
+    start = time.perf_counter()
+    ttft = None
+    async with client.stream("POST", "/chat/stream/", json=body) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if ttft is None and line == "event: token":
+                ttft = (time.perf_counter() - start) * 1000
+            elif line == "event: error":
+                raise RuntimeError("The stream reported an error")
+    return ttft
+
+
+async def run_load(client: httpx.AsyncClient, args: argparse.Namespace, turns: int, tag: str) -> dict:
+    latencies: list[float] = []
+    ttfts: list[float] = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker(worker_id: int) -> None:
+        nonlocal errors
+        for turn in iter(lambda: next(counter), None):
+            if turn >= turns:
+                return
+            body = {
+                "query": QUERIES[turn % len(QUERIES)],
+                "sessionId": f"{tag}-{worker_id}-{turn // args.turns_per_session}",
+            }
+            start = time.perf_counter()
+            try:
+                ttft = await chat_turn(client, args.endpoint, body)
+            except (httpx.HTTPError, RuntimeError) as e:
+                errors += 1
+                logger.warning("Turn %d failed: %r", turn, e)
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            if ttft is not None:
+                ttfts.append(ttft)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(args.concurrency)])
+    duration = time.perf_counter() - start
+    return {
+        "turns": turns,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "requests_per_second": round(len(latencies) / duration, 2) if duration else 0.0,
+        "latency_ms": summarize(latencies),
+        "ttft_ms": summarize(ttfts),
+    }
+
+
+async def benchmark(args: argparse.Namespace) -> dict:
+    install_fakes(args)
+    import uvicorn
+    from main import app
+
+    # main configures logging on import, the app's own levels apply unless overridden
+    if args.log_level:
+        logging.getLogger("backend").setLevel(args.log_level)
+
+    # a real server, the in-process ASGI transport buffers responses and hides TTFT
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+    )
+    serve = asyncio.create_task(server.serve())
+    while not server.started:
+        if serve.done():
+            serve.result()
+        await asyncio.sleep(0.05)
+    host, port = server.servers[0].sockets[0].getsockname()[:2]
+
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://{host}:{port}",
+            timeout=None,
+            limits=httpx.Limits(max_connections=args.concurrency),
+        ) as client:
+            await app.state.warm_up
+            if args.warmup:
+                await run_load(client, args, args.warmup, "warmup")
+            gc.collect()
+            rss_start = current_rss_mb()
+            results = await run_load(client, args, args.turns, "bench")
+            gc.collect()
+            rss_end = current_rss_mb()
+    finally:
+        server.should_exit = True
+        await serve
+
+    results["rss_mb"] = {"start": round(rss_start, 1), "end": round(rss_end, 1)}
+    results["rss_growth_mb_per_1000_turns"] = round(
+        (rss_end - rss_start) / args.turns * 1000, 2
+    )
+    return results
+
+
+def compare(results: dict, baseline: dict) -> list[str]:
+    """Formats the change of each compared metric against a baseline run."""
+    lines = []
+    for metric, key in COMPARED_METRICS + [("requests_per_second", None)]:
+        current, previous = results.get(metric), baseline.get(metric)
+        if key is not None:
+            current = current and current.get(key)
+            previous = previous and previous.get(key)
+        if current is None or previous is None:
+            continue
+        name = f"{metric}.{key}" if key else metric
+        change = f"{(current - previous) / previous:+.1%}" if previous else "n/a"
+        lines.append(f"{name}: {previous} -> {current} ({change})")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--turns-per-session", type=int, default=10)
+    parser.add_argument("--endpoint", choices=["stream", "chat"], default="stream")
+    parser.add_argument("--token-rate", type=float, default=200, help="fake model tokens per second")
+    parser.add_argument("--prompt-seconds", type=float, default=0.05, help="fake model delay before the first token")
+    parser.add_argument("--answer-tokens", type=int, default=64)
+    parser.add_argument("--tool-latency", type=float, default=0.1, help="stub weather and search latency")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="baseline result file to compare against")
+    parser.add_argument("--log-level", help="override the level of the backend loggers, e.g. WARNING")
+    args = parser.parse_args()
+
+    started = datetime.now(timezone.utc)
+    results = asyncio.run(benchmark(args))
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "started": started.isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "config": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        "results": results,
+    }
+
+    output = args.output or RESULTS_DIR / f"{started:%Y%m%dT%H%M%S}-{commit or 'nogit'}-{args.endpoint}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        print(f"Compared to {args.compare}:")
+        for line in compare(results, baseline):
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
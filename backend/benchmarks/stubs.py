@@ -0,0 +1,72 @@
+import asyncio
+import random
+import time
+import httpx
+from typing import Any, Optional
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel
+
+
+class StubSearchInput(BaseModel):
+    query: str
+    topic: Optional[str] = None
+    time_range: Optional[str] = None
+
+
+class StubWebSearch(BaseTool):
+    """Offline stand-in for TavilySearch with the same name and a fixed latency."""
+
+    name: str = "tavily_search"
+    description: str = "Searches the web and returns the most relevant results."
+    args_schema: type[BaseModel] = StubSearchInput
+    latency_seconds: float = 0.2
+
+    def _run(self, query: str, **kwargs: Any) -> dict:
+        time.sleep(self.latency_seconds)
+        return search_results(query)
+
+    async def _arun(self, query: str, **kwargs: Any) -> dict:
+        await asyncio.sleep(self.latency_seconds)
+        return search_results(query)
+
+
+def search_results(query: str) -> dict:
+    """Returns a canned Tavily-shaped response for the query."""
+    return {
+        "query": query,
+        "results": [
+            {
+                "title": f"Result {i} for {query}",
+                "url": f"https://example.com/{i}",
+                "content": f"Stub content {i} about {query}. " * 20,
+                "score": 1 / (i + 1),
+            }
+            for i in range(2)
+        ],
+    }
+
+
+def weather_transport(latency_seconds: float = 0.1, seed: int = 0) -> httpx.MockTransport:
+    """Returns an httpx transport answering OpenWeatherMap requests with canned data."""
+    rng = random.Random(seed)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency_seconds)
+        city = request.url.params.get("q", "").split(",")[0]
+        return httpx.Response(
+            200,
+            json={
+                "name": city.title(),
+                "weather": [{"main": "Clouds", "description": "broken clouds"}],
+                "main": {
+                    "temp": round(rng.uniform(-5, 30), 1),
+                    "feels_like": round(rng.uniform(-8, 30), 1),
+                    "humidity": rng.randint(30, 90),
+                    "pressure": 1013,
+                },
+                "wind": {"speed": round(rng.uniform(0, 10), 1), "deg": 200},
+                "clouds": {"all": 75},
+            },
+        )
+
+    return httpx.MockTransport(handler)
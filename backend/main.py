@@ -1,35 +1,112 @@
-import logging
-import logging.config
-from fastapi import FastAPI, HTTPException
+from typing import Literal
+from fastapi import FastAPI, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from models.chat import ChatQuery
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from models.chat import ChatQuery, ImageUploadResponse
 from models.config import ConfigResponse, ModelConfig
-from utils.config import read_config, update_config
-from agent.create import create_vea_agent
+from utils.config import (
+    read_config,
+    read_history_config,
+    read_logging_config,
+    read_ollama_config,
+    update_config,
+)
+from agent.batch import read_batch, run_batch
+from agent.create import create_vea_agent, get_llm_cache
+from agent.prompt import context_window
+from tools.weather import close_weather_client, get_weather_cache
+from utils.ollama import close_ollama_client, get_model_capabilities, preload_model
+from utils.admission import PRIORITIES, AdmissionRejected, admission_stats
+from utils.image_processing import close_image_pool, get_image_cache
+from utils.image_store import ImageTooLargeError, get_image_store
+from utils.disconnect import (
+    ClientDisconnected,
+    iterate_until_disconnected,
+    run_until_disconnected,
+)
+from utils.log import setup_logging
+from utils.streaming import format_sse
 import asyncio
-import subprocess
-
-
-# Configure logging
-try:
-    logging.config.fileConfig("config/logging.conf")
-    logger = logging.getLogger("backend")
-except Exception as e:
-    # Fallback to basic logging configuration
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler("app.log"),
-            logging.StreamHandler()
-        ]
-    )
-    logger = logging.getLogger(__name__)
-    logger.warning(
-        "Failed to load logging configuration from file, using basic config: %s", e
+import httpx
+import json
+import time
+
+
+# Configure logging, handlers run on a background thread behind a queue
+logger = setup_logging("config/logging.conf", read_logging_config())
+
+
+async def build_agent(app: FastAPI) -> None:
+    """Builds the agent off the event loop so the first request doesn't pay for it"""
+    start = time.perf_counter()
+    agent = await asyncio.to_thread(create_vea_agent)
+    if app.agent is None:
+        app.agent = agent
+    app.state.startup_timings["agent"] = round(time.perf_counter() - start, 3)
+    logger.info(
+        "Startup phase 'agent' finished in %.3fs", app.state.startup_timings["agent"]
     )
 
-app = FastAPI()
+
+async def warm_up(app: FastAPI) -> None:
+    """Waits for the agent build and loads the configured Ollama models, timing each phase"""
+    timings = app.state.startup_timings
+    await app.state.build_agent
+
+    ollama_config = read_ollama_config()
+    if ollama_config.preload_models:
+        start = time.perf_counter()
+        config = read_config()
+        # the tool model is loaded with the context window the agent requests
+        models = {}
+        if config.image_model.startswith("ollama:"):
+            models[config.image_model.split(":", 1)[1]] = None
+        if config.tool_model.startswith("ollama:"):
+            models[config.tool_model.split(":", 1)[1]] = context_window(
+                read_history_config().max_tokens_for(config.tool_model), ollama_config
+            )
+        results = await asyncio.gather(
+            *[
+                preload_model(model, ollama_config.keep_alive, num_ctx)
+                for model, num_ctx in models.items()
+            ],
+            return_exceptions=True,
+        )
+        for model, result in zip(models, results):
+            if isinstance(result, Exception):
+                logger.warning("Failed to preload Ollama model %s: %r", model, result)
+        timings["preload"] = round(time.perf_counter() - start, 3)
+        logger.info("Startup phase 'preload' finished in %.3fs", timings["preload"])
+
+    app.state.ready = True
+    logger.info("Vea is ready, startup timings: %s", timings)
+
+
+def log_warm_up_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Startup warm-up failed: %r", task.exception())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.startup_timings = {}
+    app.state.build_agent = asyncio.create_task(build_agent(app))
+    app.state.warm_up = asyncio.create_task(warm_up(app))
+    app.state.warm_up.add_done_callback(log_warm_up_failure)
+
+    yield
+
+    app.state.build_agent.cancel()
+    app.state.warm_up.cancel()
+    await close_weather_client()
+    await close_ollama_client()
+    close_image_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["http://localhost:3000"]
 
@@ -43,41 +120,217 @@ app.add_middleware(
 app.agent = None
 
 
-@app.post("/chat/")
-async def call_vea_agent(body: ChatQuery):
-    """Endpoint to interact with the VeaAgent"""
-    logger.info("Received chat request: %s", body.query)
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, e: AdmissionRejected) -> JSONResponse:
+    """Maps a saturated model to 429 or 503 with a Retry-After hint"""
+    return JSONResponse(
+        status_code=e.status_code,
+        content={"detail": str(e), "retryAfter": e.retry_after},
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
+
+async def get_agent():
+    """Returns the shared agent, waiting for the startup build or creating it on first use.
+    Sessions share one compiled graph."""
     if app.agent is None:
-        logger.info("Creating new Vea agent")
-        app.agent = create_vea_agent()
+        build_task = getattr(app.state, "build_agent", None)
+        if build_task is not None and not build_task.done():
+            logger.info("Waiting for the startup build of the agent")
+            await asyncio.shield(build_task)
+        if app.agent is None:
+            logger.info("Creating new Vea agent")
+            app.agent = await asyncio.to_thread(create_vea_agent)
+    return app.agent
 
-    if body.image_data:
-        logger.info("Processing image data with chat query")
-        app.agent.graph.update_state(app.agent.config, {"image_data": body.image_data})
-    else:
-        app.agent.graph.update_state(app.agent.config, {"image_data": None})
 
-    response = await app.agent.query(body.query)
+@app.get("/ready/")
+def readiness() -> JSONResponse:
+    """Readiness probe, 200 once the agent is built and models are warm, 503 before that"""
+    ready = getattr(app.state, "ready", False)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "startupTimings": getattr(app.state, "startup_timings", {}),
+        },
+    )
+
+
+def check_admission(agent, body: ChatQuery) -> None:
+    """Rejects the request up front when the model answering it has no room in its queue"""
+    vision = bool(body.image_data or body.image_id)
+    agent.admission(vision).check(PRIORITIES[body.priority])
+
+
+def check_image_reference(body: ChatQuery) -> None:
+    """Rejects chat requests that reference an image missing from the store"""
+    if body.image_id and not get_image_store().exists(body.image_id):
+        logger.warning("Chat request references unknown image %s", body.image_id)
+        raise HTTPException(status_code=404, detail=f"Image {body.image_id} not found")
+
+
+@app.post("/images/")
+async def upload_image(file: UploadFile) -> ImageUploadResponse:
+    """Endpoint to upload an image once, returns the id to reference it from /chat/"""
+    logger.info("Received image upload: %s (%s)", file.filename, file.content_type)
+    if file.content_type and not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=415, detail=f"Unsupported content type: {file.content_type}"
+        )
+
+    try:
+        image_id, size, created = await asyncio.to_thread(
+            get_image_store().save, file.file
+        )
+    except ImageTooLargeError as e:
+        logger.warning("Rejected image upload: %s", e)
+        raise HTTPException(status_code=413, detail=str(e))
+    finally:
+        await file.close()
+
+    return ImageUploadResponse(image_id=image_id, size=size, created=created)
+
+
+@app.post("/chat/")
+async def call_vea_agent(body: ChatQuery, request: Request):
+    """Endpoint to interact with the VeaAgent, the turn is cancelled if the client disconnects"""
+    logger.info("Received chat request for session %s: %s", body.session_id, body.query)
+    check_image_reference(body)
+    agent = await get_agent()
+    check_admission(agent, body)
+
+    if body.image_data or body.image_id:
+        logger.info("Processing image data with chat query")
+    try:
+        response = await run_until_disconnected(
+            request,
+            agent.query(
+                body.query,
+                body.session_id,
+                body.image_data,
+                body.image_id,
+                body.bypass_cache,
+                body.debug,
+                PRIORITIES[body.priority],
+            ),
+        )
+    except ClientDisconnected:
+        # nobody is listening, the status only shows up in access logs
+        return Response(status_code=499)
     return response
 
 
-async def get_model_info(name: str) -> tuple[str, str]:
-    logger.debug("Fetching info for Ollama model: %s", name)
-    proc = await asyncio.create_subprocess_exec(
-        "ollama",
-        "show",
-        name,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
+@app.post("/chat/stream/")
+async def stream_vea_agent(body: ChatQuery, request: Request) -> StreamingResponse:
+    """Streaming variant of /chat/, pushes tokens, thinking traces and tool events as Server-Sent Events"""
+    logger.info(
+        "Received streaming chat request for session %s: %s", body.session_id, body.query
+    )
+    check_image_reference(body)
+    agent = await get_agent()
+    # the status can't change once the stream started, later rejections become error events
+    check_admission(agent, body)
+
+    async def event_stream():
+        try:
+            events = agent.stream_query(
+                body.query,
+                body.session_id,
+                body.image_data,
+                body.image_id,
+                body.bypass_cache,
+                body.debug,
+                PRIORITIES[body.priority],
+            )
+            async for event in iterate_until_disconnected(request, events):
+                yield format_sse(event)
+        except ClientDisconnected:
+            return
+        except AdmissionRejected as e:
+            yield format_sse(
+                {"type": "error", "detail": str(e), "retryAfter": e.retry_after}
+            )
+        except Exception as e:
+            logger.error("Streaming chat request failed: %s", str(e))
+            yield format_sse({"type": "error", "detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    stdout, stderr = await proc.communicate()
-    if proc.returncode != 0:
-        error_msg = f"Failed to show model '{name}': {stderr.decode().strip()}"
-        logger.error(error_msg)
-        raise RuntimeError(error_msg)
-    logger.debug("Successfully fetched info for model: %s", name)
-    return name, stdout.decode()
+
+
+@app.post("/chat/batch/")
+async def batch_vea_agent(
+    request: Request,
+    offset: int = Query(default=0, ge=0),
+    concurrency: int = Query(default=4, ge=1, le=64),
+    priority: Literal["high", "normal", "low"] = "low",
+) -> StreamingResponse:
+    """Runs a JSONL body of chat queries, streams a JSON line per item as it finishes and a summary.
+    Pass the last `resumeOffset` received as `offset` to resume an interrupted batch"""
+    try:
+        entries = await read_batch(request.stream(), offset)
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Batch body is not UTF-8: {e}")
+    logger.info("Received batch of %d lines from offset %d", len(entries), offset)
+    agent = await get_agent()
+
+    async def result_stream():
+        results = run_batch(agent, entries, offset, concurrency, PRIORITIES[priority])
+        try:
+            async for result in iterate_until_disconnected(request, results):
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        except ClientDisconnected:
+            return
+
+    return StreamingResponse(
+        result_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/memory-stats/")
+def memory_stats() -> dict[str, int]:
+    """Endpoint to report conversation memory usage: threads, checkpoint bytes and evictions"""
+    if app.agent is None or not hasattr(app.agent.memory, "stats"):
+        return {}
+    return app.agent.memory.stats()
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    """Prometheus scrape endpoint for LLM, tool, queue and turn metrics"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/admission-stats/")
+def get_admission_stats() -> dict[str, dict[str, int | float]]:
+    """Endpoint to report in-flight generations, queue depth and rejections per model"""
+    return admission_stats()
+
+
+@app.get("/routing-stats/")
+def routing_stats() -> dict[str, dict[str, int | float | str]]:
+    """Endpoint to report turns, LLM calls and average LLM latency per model route"""
+    if app.agent is None or app.agent.router is None:
+        return {}
+    return app.agent.router.stats()
+
+
+@app.get("/cache-stats/")
+def cache_stats() -> dict[str, dict[str, int | float]]:
+    """Endpoint to report hit/miss counters of the tool result, image and LLM response caches"""
+    stats = {"weather": get_weather_cache().stats(), "images": get_image_cache().stats()}
+    if app.agent is not None and app.agent.web_search is not None:
+        stats["web_search"] = app.agent.web_search.stats()
+    llm_cache = get_llm_cache()
+    if llm_cache is not None:
+        stats["llm"] = llm_cache.stats()
+    return stats
 
 
 @app.get("/show-ollama-models/")
@@ -87,16 +340,9 @@ async def show_ollama_models() -> ConfigResponse:
     """
     logger.info("Fetching available Ollama models")
     try:
-        result = subprocess.run(
-            ["ollama", "list"], capture_output=True, text=True, check=True
-        )
-        result = result.stdout.splitlines()[1:]
-        model_names = [r.split(" ")[0] for r in result]
-        logger.debug("Found %d Ollama models: %s", len(model_names), model_names)
-
-        # concurrent execution
-        show_results = await asyncio.gather(
-            *[get_model_info(name) for name in model_names]
+        model_capabilities = await get_model_capabilities()
+        logger.debug(
+            "Found %d Ollama models: %s", len(model_capabilities), list(model_capabilities)
         )
 
         tool_models = []
@@ -106,10 +352,10 @@ async def show_ollama_models() -> ConfigResponse:
         curr_tool_model_name = config.tool_model.split(":", 1)[1]
         curr_vision_model_name = config.image_model.split(":", 1)[1]
 
-        for model_name, info in show_results:
-            if "tools" in info:
+        for model_name, capabilities in model_capabilities.items():
+            if "tools" in capabilities:
                 tool_models.append(model_name)
-            if "vision" in info:
+            if "vision" in capabilities:
                 vision_models.append(model_name)
 
         logger.info(
@@ -127,9 +373,9 @@ async def show_ollama_models() -> ConfigResponse:
         )
         logger.info("Successfully returned model configuration")
         return response
-    except subprocess.CalledProcessError as e:
-        logger.error("Ollama list command failed: %s", e.stderr)
-        raise HTTPException(status_code=500, detail=f"Ollama list failed: {e.stderr}")
+    except httpx.HTTPError as e:
+        logger.error("Ollama API request failed: %r", e)
+        raise HTTPException(status_code=500, detail=f"Ollama list failed: {e!r}")
     except Exception as e:
         logger.error("Unexpected error in show_ollama_models: %s", str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -145,11 +391,13 @@ def update_model_config(body: ModelConfig) -> dict[str, str]:
 
     update_config(body.tool_model, body.image_model, body.tools_config)
 
-    # create a new agent when configs is changed
-    logger.info("Creating new agent with updated configuration")
+    # build or reuse an agent for the new config, then swap it in with a single assignment.
+    # in-flight turns hold a reference to the old agent and finish on it, conversations
+    # live in the shared checkpointer and carry over
+    logger.info("Switching agent to updated configuration")
     app.agent = create_vea_agent()
 
-    logger.info("Agent created successfully")
+    logger.info("Agent switched successfully")
     return {
         "message": "Model configuration updated and saved.",
     }
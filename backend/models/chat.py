@@ -1,4 +1,5 @@
 import logging
+from typing import Literal
 from pydantic import BaseModel, Field, AliasChoices
 
 
@@ -12,8 +13,64 @@ class ChatQuery(BaseModel):
         validation_alias=AliasChoices("imageData", "image_data"),
         default="",
     )
-    
+    image_id: str = Field(
+        serialization_alias="imageId",
+        validation_alias=AliasChoices("imageId", "image_id"),
+        default="",
+        pattern=r"^([0-9a-f]{64})?$",
+    )
+    session_id: str = Field(
+        serialization_alias="sessionId",
+        validation_alias=AliasChoices("sessionId", "session_id"),
+        default="default",
+        min_length=1,
+        max_length=128,
+    )
+    # skip the LLM response cache lookup for this request, the fresh answer is still cached
+    bypass_cache: bool = Field(
+        serialization_alias="bypassCache",
+        validation_alias=AliasChoices("bypassCache", "bypass_cache"),
+        default=False,
+    )
+    # print every graph step with its full state to the server's stdout
+    debug: bool = False
+    # order among requests waiting for a model slot, "low" suits background work
+    priority: Literal["high", "normal", "low"] = "normal"
+
     def __init__(self, **data):
         super().__init__(**data)
-        logger.debug("ChatQuery created with query: %s, image_data length: %d", 
-                    self.query, len(self.image_data))
+        logger.debug("ChatQuery created with query: %s, session_id: %s, image_id: %s, image_data length: %d",
+                    self.query, self.session_id, self.image_id, len(self.image_data))
+
+
+class BatchItem(BaseModel):
+    """One line of a /chat/batch/ request."""
+
+    # echoed back in the result, defaults to the line index
+    id: str | None = None
+    query: str
+    image_data: str = Field(
+        validation_alias=AliasChoices("imageData", "image_data"),
+        default="",
+    )
+    image_id: str = Field(
+        validation_alias=AliasChoices("imageId", "image_id"),
+        default="",
+        pattern=r"^([0-9a-f]{64})?$",
+    )
+    # items without a session run in a thread of their own that is deleted afterwards
+    session_id: str | None = Field(
+        validation_alias=AliasChoices("sessionId", "session_id"),
+        default=None,
+        min_length=1,
+        max_length=128,
+    )
+
+
+class ImageUploadResponse(BaseModel):
+    image_id: str = Field(
+        alias="imageId",
+        validation_alias=AliasChoices("imageId", "image_id"),
+    )
+    size: int
+    created: bool
@@ -1,10 +1,14 @@
 import logging
-from pydantic import BaseModel, Field, AliasChoices
+from typing import Annotated, Literal
+from pydantic import BaseModel, ConfigDict, Field, AliasChoices, model_validator
 
 
 logger = logging.getLogger(__name__)
 
 class ModelConfig(BaseModel):
+    # read_config caches and shares instances, so config models are immutable
+    model_config = ConfigDict(frozen=True)
+
     tool_model: str = Field(
         serialization_alias="toolModel",
         validation_alias=AliasChoices("toolModel", "tool_model"),
@@ -45,3 +49,265 @@ class ConfigResponse(BaseModel):
         super().__init__(**data)
         logger.debug("ConfigResponse created with %d tool models and %d vision models", 
                     len(self.tool), len(self.vision))
+
+
+class MemoryConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    max_checkpoints_per_thread: int = Field(default=10, ge=1)
+    idle_ttl_seconds: float | None = Field(default=3600, gt=0)
+    max_megabytes: float | None = Field(default=256, gt=0)
+    strip_images: bool = True
+
+
+class HistoryConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    enabled: bool = True
+    default_max_tokens: int = Field(default=8192, gt=0)
+    # per-model overrides keyed by "provider:name", e.g. "ollama:qwen3:4b"
+    model_max_tokens: dict[str, int] = Field(default_factory=dict)
+    recent_ratio: float = Field(default=0.5, gt=0, le=1)
+    summary_max_tokens: int = Field(default=512, gt=0)
+
+    def max_tokens_for(self, model_name: str) -> int:
+        return self.model_max_tokens.get(model_name, self.default_max_tokens)
+
+
+class ToolLLMConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    temperature: float | None = None
+
+
+class VisionLLMConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    temperature: float | None = None
+    timeout_seconds: float = Field(default=120, gt=0)
+    max_concurrency: int = Field(default=2, ge=1)
+
+
+class ImageStoreConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    store_dir: str = "data/images"
+    max_upload_megabytes: float = Field(default=20, gt=0)
+    # uploads past these limits evict the least recently used images, None disables
+    max_store_megabytes: float | None = Field(default=1024, gt=0)
+    max_age_days: float | None = Field(default=30, gt=0)
+
+
+class ImageProcessingConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    # decode, orient, downscale and re-encode images before they reach the vision model
+    enabled: bool = True
+    # longest edge in pixels, larger images are downscaled
+    default_max_edge: int = Field(default=1024, ge=64)
+    # per-model overrides keyed by "provider:name", e.g. "ollama:gemma3:12b"
+    model_max_edge: dict[str, int] = Field(default_factory=dict)
+    jpeg_quality: int = Field(default=85, ge=1, le=95)
+    # processes decoding images, the work is CPU bound and holds the GIL
+    max_workers: int = Field(default=2, ge=1)
+    # processed images kept by content hash and model settings
+    cache_size: int = Field(default=64, ge=1)
+    cache_ttl_seconds: float = Field(default=3600, gt=0)
+
+    def max_edge_for(self, model_name: str) -> int:
+        return self.model_max_edge.get(model_name, self.default_max_edge)
+
+
+class WeatherConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    # OPENWEATHER_BASE_URL overrides this, e.g. to point at a local stub server
+    base_url: str = "http://api.openweathermap.org/data/2.5/weather"
+    timeout_seconds: float = Field(default=10, gt=0)
+    connect_timeout_seconds: float = Field(default=5, gt=0)
+    max_connections: int = Field(default=10, ge=1)
+    cache_ttl_seconds: float = Field(default=600, ge=0)
+    cache_size: int = Field(default=256, ge=1)
+
+
+class WebSearchConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    max_results: int = Field(default=2, ge=1)
+    cache_size: int = Field(default=512, ge=1)
+    default_ttl_seconds: float = Field(default=3600, ge=0)
+    # TTL per freshness class, keyed by the search topic or time_range
+    freshness_ttl_seconds: dict[str, float] = Field(
+        default_factory=lambda: {"news": 600, "finance": 300, "day": 600}
+    )
+
+
+class OllamaConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    # OLLAMA_HOST overrides this, same as for the ollama CLI
+    base_url: str = "http://127.0.0.1:11434"
+    timeout_seconds: float = Field(default=30, gt=0)
+    show_concurrency: int = Field(default=4, ge=1)
+    # how long models stay loaded after a request, e.g. "30m", or -1 for forever
+    keep_alive: str | int = "30m"
+    # load the configured tool and vision models at startup instead of on the first request
+    preload_models: bool = True
+    # context window of the tool models, "auto" fits the model's history budget plus
+    # response_reserve_tokens, None leaves the model's default
+    num_ctx: int | Literal["auto"] | None = "auto"
+    response_reserve_tokens: int = Field(default=1024, ge=0)
+
+
+class ToolLimitsConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    timeout_seconds: float | None = Field(default=None, gt=0)
+    max_concurrency: int | None = Field(default=None, ge=1)
+    max_output_chars: int | None = Field(default=None, ge=1)
+
+
+class ToolOutputConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    # replace the raw payloads of the built-in tools with the fields the model needs
+    project: bool = True
+    # "extract" keeps the sentences of a search result sharing the most words with the
+    # query, "truncate" keeps its start
+    snippet_mode: Literal["extract", "truncate"] = "extract"
+    snippet_chars: int = Field(default=600, ge=1)
+    # tool messages stay in the history and are re-sent on every later call, longer
+    # content is cut, about 4 characters per token
+    default_max_chars: int = Field(default=4000, ge=1)
+
+
+class ToolExecutionConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    default_timeout_seconds: float = Field(default=30, gt=0)
+    # concurrent calls of the same tool, across all conversations
+    default_max_concurrency: int = Field(default=4, ge=1)
+    # deadline for all tool calls of one model message, pending calls are cancelled
+    turn_timeout_seconds: float = Field(default=60, gt=0)
+    output: ToolOutputConfig = Field(default_factory=ToolOutputConfig)
+    # per-tool overrides keyed by tool name, e.g. "fetch_weather_data"
+    tools: dict[str, ToolLimitsConfig] = Field(default_factory=dict)
+
+    def timeout_for(self, tool_name: str) -> float:
+        limits = self.tools.get(tool_name)
+        if limits and limits.timeout_seconds is not None:
+            return limits.timeout_seconds
+        return self.default_timeout_seconds
+
+    def max_concurrency_for(self, tool_name: str) -> int:
+        limits = self.tools.get(tool_name)
+        if limits and limits.max_concurrency is not None:
+            return limits.max_concurrency
+        return self.default_max_concurrency
+
+    def max_output_chars_for(self, tool_name: str) -> int:
+        limits = self.tools.get(tool_name)
+        if limits and limits.max_output_chars is not None:
+            return limits.max_output_chars
+        return self.output.default_max_chars
+
+
+class AdmissionLimitsConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    max_in_flight: int | None = Field(default=None, ge=1)
+    max_queue: int | None = Field(default=None, ge=0)
+    max_wait_seconds: float | None = Field(default=None, gt=0)
+
+
+class AdmissionConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    # concurrent generations per model, more are queued
+    default_max_in_flight: int = Field(default=2, ge=1)
+    # waiting generations per model, more are rejected with 429
+    default_max_queue: int = Field(default=16, ge=0)
+    # queued generations give up with 503 after this long
+    default_max_wait_seconds: float = Field(default=30, gt=0)
+    # per-model overrides keyed by "provider:name", e.g. "ollama:qwen3:4b"
+    models: dict[str, AdmissionLimitsConfig] = Field(default_factory=dict)
+
+    def limits_for(
+        self, model_name: str, default_max_in_flight: int | None = None
+    ) -> AdmissionLimitsConfig:
+        """Resolves the model's limits, `default_max_in_flight` replaces the global default."""
+        limits = self.models.get(model_name) or AdmissionLimitsConfig()
+        return AdmissionLimitsConfig(
+            max_in_flight=limits.max_in_flight
+            or default_max_in_flight
+            or self.default_max_in_flight,
+            max_queue=(
+                limits.max_queue
+                if limits.max_queue is not None
+                else self.default_max_queue
+            ),
+            max_wait_seconds=limits.max_wait_seconds or self.default_max_wait_seconds,
+        )
+
+
+class RouteConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    # "provider:name", e.g. "ollama:qwen3:0.6b"
+    model: str
+    temperature: float | None = None
+    # keys of the tools section bound on this route, None binds every enabled tool
+    tools: list[str] | None = None
+
+
+class RoutingRule(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    route: str
+    max_chars: int | None = Field(default=None, ge=1)
+    keywords: list[str] = Field(default_factory=list)
+    exclude_keywords: list[str] = Field(default_factory=list)
+
+
+class RoutingConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    enabled: bool = False
+    # routes besides "default", the configured tool model with every enabled tool
+    routes: dict[str, RouteConfig] = Field(default_factory=dict)
+    # checked in order, the first matching rule picks the route
+    rules: list[RoutingRule] = Field(default_factory=list)
+
+    @model_validator(mode="after")
+    def check_routes(self) -> "RoutingConfig":
+        if "default" in self.routes:
+            raise ValueError('"default" is the configured tool model and can\'t be redefined')
+        unknown = {rule.route for rule in self.rules} - {"default", *self.routes}
+        if unknown:
+            raise ValueError(f"Rules refer to undefined routes: {sorted(unknown)}")
+        return self
+
+
+class LLMCacheConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    # "deterministic" caches only when the tool model's temperature is 0, "always" caches
+    # sampled answers too, e.g. for replaying test dialogs
+    mode: Literal["off", "deterministic", "always"] = "deterministic"
+    path: str = "data/llm_cache.sqlite3"
+    max_megabytes: float = Field(default=64, gt=0)
+
+
+class LoggingConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    # longer string arguments are truncated before the message is formatted
+    max_field_chars: int = Field(default=500, ge=16)
+    # dict keys whose values are never logged, e.g. base64 image payloads
+    redact_fields: list[str] = Field(
+        default_factory=lambda: ["image_data", "imageData"]
+    )
+    # fraction of records below WARNING kept per logger name prefix, e.g. {"backend.tools": 0.1}
+    sample_rates: dict[str, Annotated[float, Field(ge=0, le=1)]] = Field(
+        default_factory=dict
+    )
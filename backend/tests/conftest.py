@@ -0,0 +1,19 @@
+from pathlib import Path
+import pytest
+import utils.admission
+import utils.config
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(autouse=True)
+def agent_config(monkeypatch):
+    """Reads the shipped agent.yaml wherever pytest is started from."""
+    monkeypatch.setattr(utils.config, "CONFIG_PATH", BACKEND_DIR / "config" / "agent.yaml")
+
+
+@pytest.fixture(autouse=True)
+def admission_controllers(monkeypatch):
+    """Gives every test its own admission controllers and counters."""
+    monkeypatch.setattr(utils.admission, "_controllers", {})
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import pytest
+from main import admission_rejected
+from models.config import AdmissionLimitsConfig
+from utils.admission import PRIORITIES, AdmissionController, AdmissionRejected
+
+
+def controller(max_in_flight=1, max_queue=1, max_wait_seconds=0.05) -> AdmissionController:
+    return AdmissionController(
+        "m",
+        AdmissionLimitsConfig(
+            max_in_flight=max_in_flight,
+            max_queue=max_queue,
+            max_wait_seconds=max_wait_seconds,
+        ),
+    )
+
+
+def response_for(e: AdmissionRejected) -> tuple[int, dict, str]:
+    response = asyncio.run(admission_rejected(None, e))
+    return response.status_code, json.loads(response.body), response.headers["Retry-After"]
+
+
+def test_full_queue_is_rejected_with_429():
+    admission = controller(max_wait_seconds=1)
+
+    async def main():
+        await admission.acquire()
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        admission.release()
+        await waiter
+        admission.release()
+        return rejected.value
+
+    e = asyncio.run(main())
+    assert e.reason == "queue_full"
+    status, body, retry_after = response_for(e)
+    assert status == 429
+    assert body["retryAfter"] == int(retry_after) >= 1
+    assert admission.stats()["admitted"] == 2
+    assert admission.stats()["rejected"] == 1
+
+
+def test_wait_past_the_deadline_is_rejected_with_503():
+    admission = controller()
+
+    async def main():
+        await admission.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire()
+        return rejected.value
+
+    e = asyncio.run(main())
+    assert e.reason == "timeout"
+    assert response_for(e)[0] == 503
+    # the timed out waiter left the queue
+    assert admission.queued == 0
+
+
+def test_check_rejects_without_reserving():
+    admission = controller(max_queue=0)
+    admission.check()
+
+    async def main():
+        async with admission.admit():
+            with pytest.raises(AdmissionRejected) as rejected:
+                admission.check()
+            assert rejected.value.status_code == 429
+            assert admission.in_flight == 1
+
+    asyncio.run(main())
+    assert admission.in_flight == 0
+
+
+def test_higher_priority_displaces_the_latest_lower_priority_waiter():
+    admission = controller(max_wait_seconds=1)
+
+    async def main():
+        await admission.acquire()
+        low = asyncio.create_task(admission.acquire(PRIORITIES["low"]))
+        await asyncio.sleep(0)
+        # the queue is full, but not for a higher priority
+        admission.check(PRIORITIES["high"])
+        high = asyncio.create_task(admission.acquire(PRIORITIES["high"]))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as displaced:
+            await low
+        admission.release()
+        await high
+        admission.release()
+        return displaced.value
+
+    e = asyncio.run(main())
+    assert e.reason == "displaced"
+    assert e.status_code == 429
+    assert admission.in_flight == 0
+
+
+def test_released_slots_go_to_waiters_in_priority_order():
+    admission = controller(max_queue=2, max_wait_seconds=1)
+    order = []
+
+    async def request(name: str, priority: int):
+        async with admission.admit(priority):
+            order.append(name)
+
+    async def main():
+        await admission.acquire()
+        tasks = [
+            asyncio.create_task(request("low", PRIORITIES["low"])),
+            asyncio.create_task(request("high", PRIORITIES["high"])),
+        ]
+        await asyncio.sleep(0)
+        admission.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["high", "low"]
@@ -0,0 +1,118 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from langchain_core.messages import AIMessage, HumanMessage
+from fastapi.testclient import TestClient
+from agent.batch import read_batch, run_batch
+from main import app
+from models.config import AdmissionLimitsConfig
+from utils.admission import AdmissionController
+
+LIMITS = AdmissionLimitsConfig(max_in_flight=64, max_queue=0, max_wait_seconds=1)
+
+
+class FakeAgent:
+    """Answers after a delay given in the query, recording when turns start and end."""
+
+    def __init__(self):
+        self.events = []
+        self.messages = {}
+        self.graph = SimpleNamespace(aget_state=self.aget_state)
+        self.memory = SimpleNamespace(delete_thread=lambda session_id: None)
+
+    def admission(self, vision: bool = False) -> AdmissionController:
+        return AdmissionController("m", LIMITS)
+
+    def get_config(self, session_id: str) -> dict:
+        return {"configurable": {"thread_id": session_id}}
+
+    async def aget_state(self, config: dict):
+        messages = self.messages[config["configurable"]["thread_id"]]
+        return SimpleNamespace(values={"messages": messages})
+
+    async def query(self, query, session_id, image_data, image_id, **kwargs) -> str:
+        self.events.append(("start", query))
+        await asyncio.sleep(float(query.split()[-1]))
+        self.events.append(("end", query))
+        self.messages[session_id] = [HumanMessage(query), AIMessage(f"re {query}")]
+        return f"re {query}"
+
+
+async def chunks(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start : start + size]
+
+
+def jsonl(*items: dict) -> bytes:
+    return "".join(json.dumps(item) + "\n" for item in items).encode()
+
+
+def run(agent: FakeAgent, body: bytes, offset: int = 0, concurrency: int = 4) -> list[dict]:
+    async def main():
+        entries = await read_batch(chunks(body, 7), offset)
+        return [result async for result in run_batch(agent, entries, offset, concurrency)]
+
+    return asyncio.run(main())
+
+
+def test_reads_lines_split_across_chunks():
+    body = jsonl({"query": "héllo 0"}, {"query": "wörld 0"}) + b'\n{"query": "last 0"}'
+
+    async def main():
+        return await read_batch(chunks(body, 3))
+
+    entries = asyncio.run(main())
+    assert [entry and entry.query for entry in entries] == ["héllo 0", "wörld 0", None, "last 0"]
+
+
+def test_runs_the_lines_of_a_session_in_order():
+    agent = FakeAgent()
+    body = jsonl(
+        {"query": "a1 0.05", "sessionId": "a"},
+        {"query": "b1 0.01", "sessionId": "b"},
+        {"query": "a2 0", "sessionId": "a"},
+        {"query": "a3 0", "sessionId": "a"},
+    )
+
+    results = run(agent, body)
+
+    starts = [query for event, query in agent.events if event == "start"]
+    a_events = [event for event in agent.events if event[1].startswith("a")]
+    assert a_events == [
+        (event, query)
+        for query in ("a1 0.05", "a2 0", "a3 0")
+        for event in ("start", "end")
+    ]
+    # the other session didn't wait for the first
+    assert starts.index("b1 0.01") < starts.index("a2 0")
+    assert [result["index"] for result in results[:-1]] == [1, 0, 2, 3]
+    assert results[-1]["ok"] == 4
+
+
+def test_runs_lines_without_a_session_in_parallel():
+    agent = FakeAgent()
+    body = jsonl({"query": "x 0.05"}, {"query": "y 0.05"}, {"query": "z 0"})
+
+    run(agent, body, concurrency=3)
+
+    assert [event for event, _ in agent.events[:3]] == ["start"] * 3
+
+
+def test_reports_invalid_lines_and_skips_before_the_offset():
+    agent = FakeAgent()
+    body = jsonl({"query": "skipped 0"}, {"id": "bad"}) + b"\n" + jsonl({"query": "ok 0"})
+
+    results = run(agent, body, offset=1)
+
+    assert [event for event in agent.events if event[0] == "start"] == [("start", "ok 0")]
+    errors = [result for result in results if result.get("status") == "error"]
+    assert len(errors) == 1 and errors[0]["index"] == 1
+    assert "query: Field required" in errors[0]["error"]
+    assert results[-1]["resumeOffset"] == 4
+
+
+def test_rejects_a_body_that_is_not_utf8():
+    response = TestClient(app).post("/chat/batch/", content=b'{"query": "\xff"}\n')
+
+    assert response.status_code == 400
+    assert "not UTF-8" in response.json()["detail"]
@@ -0,0 +1,21 @@
+import os
+import shutil
+import stat
+from pathlib import Path
+import utils.config
+from utils.config import load_yaml_config, update_config
+
+
+def test_update_keeps_the_file_permissions(tmp_path, monkeypatch):
+    path = tmp_path / "agent.yaml"
+    shutil.copy(Path(__file__).parent.parent / "config" / "agent.yaml", path)
+    os.chmod(path, 0o644)
+    monkeypatch.setattr(utils.config, "CONFIG_PATH", path)
+
+    update_config("ollama:tool", "ollama:vision", {"calculate": True})
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    config = load_yaml_config()
+    assert config["llm_config"]["tool_llm"]["name"] == "ollama:tool"
+    assert config["tools"] == {"calculate": True}
+    assert [entry.name for entry in tmp_path.iterdir()] == ["agent.yaml"]
@@ -0,0 +1,100 @@
+import asyncio
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from agent.history import HistoryManager, estimate_history_tokens
+from utils.admission import admission_stats
+
+MODEL = "ollama:test"
+
+
+def conversation(turns: int, chars: int = 400) -> list:
+    messages = []
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f"q{turn} " + "x" * chars))
+        messages.append(
+            AIMessage(
+                content="",
+                tool_calls=[{"name": "calculate", "args": {"e": "1+1"}, "id": f"c{turn}"}],
+            )
+        )
+        messages.append(ToolMessage(content="2", tool_call_id=f"c{turn}"))
+        messages.append(AIMessage(content="a" * chars))
+    return messages
+
+
+def manager(max_tokens: int = 1000) -> HistoryManager:
+    return HistoryManager(
+        FakeListChatModel(responses=["the summary"]),
+        MODEL,
+        max_tokens=max_tokens,
+        summary_max_tokens=100,
+    )
+
+
+def test_under_budget_sends_everything():
+    history = manager(max_tokens=100_000)
+    messages = conversation(3)
+
+    window, update = asyncio.run(history.window({"messages": messages}))
+
+    assert window == messages
+    assert update == {}
+
+
+def test_cuts_only_before_a_user_message():
+    history = manager()
+    messages = conversation(10)
+
+    for target in range(0, 1000, 25):
+        cut = history._find_cut(messages, target)
+        assert isinstance(messages[cut], HumanMessage)
+        # the current turn always stays
+        assert cut <= len(messages) - 4
+
+
+def test_cut_keeps_as_much_recent_history_as_fits():
+    history = manager()
+    messages = conversation(10)
+    target = 500
+
+    cut = history._find_cut(messages, target)
+
+    assert estimate_history_tokens(messages[cut:]) <= target
+    previous = max(i for i in range(cut) if isinstance(messages[i], HumanMessage))
+    assert estimate_history_tokens(messages[previous:]) > target
+
+
+def test_over_budget_summarizes_through_admission():
+    history = manager()
+    messages = conversation(10)
+
+    window, update = asyncio.run(history.window({"messages": messages}))
+
+    start = update["summarized_until"]
+    assert isinstance(messages[start], HumanMessage)
+    assert update["summary"] == "the summary"
+    assert isinstance(window[0], SystemMessage) and "the summary" in window[0].content
+    assert window[1:] == messages[start:]
+    assert admission_stats()[MODEL]["admitted"] == 1
+
+
+def test_continues_from_the_previous_summary():
+    history = manager()
+    messages = conversation(10)
+    _, update = asyncio.run(history.window({"messages": messages}))
+
+    state = {"messages": messages + conversation(1), **update}
+    window, next_update = asyncio.run(history.window(state))
+
+    assert next_update == {} or next_update["summarized_until"] >= update["summarized_until"]
+    assert "the summary" in window[0].content
+
+
+def test_oversized_current_turn_is_sent_as_is():
+    history = manager()
+    messages = [HumanMessage(content="x" * 10_000)]
+
+    window, update = asyncio.run(history.window({"messages": messages}))
+
+    assert window == messages
+    assert update == {}
@@ -0,0 +1,159 @@
+import asyncio
+import base64
+import io
+import os
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from PIL import Image
+import utils.image_processing as image_processing
+from utils.image_processing import (
+    EXIF_ORIENTATION,
+    ImageProcessingError,
+    normalize_image,
+    prepare_image,
+)
+
+MODEL = "ollama:vision"
+
+
+def encode(image: Image.Image, format: str, **params) -> str:
+    output = io.BytesIO()
+    image.save(output, format=format, **params)
+    return base64.b64encode(output.getvalue()).decode("ascii")
+
+
+def decode(data: str) -> Image.Image:
+    return Image.open(io.BytesIO(base64.b64decode(data)))
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool_and_cache():
+    image_processing.get_image_cache.cache_clear()
+    yield
+    image_processing.close_image_pool()
+    image_processing.get_image_cache.cache_clear()
+
+
+def test_small_png_is_passed_through():
+    data = encode(Image.new("RGB", (40, 30), "red"), "PNG")
+
+    image = normalize_image(data, 1024, 85)
+
+    assert image.data == data
+    assert (image.mime_type, image.width, image.height) == ("image/png", 40, 30)
+
+
+def test_large_images_are_downscaled():
+    data = encode(Image.new("RGB", (3000, 1500), "blue"), "JPEG")
+
+    image = normalize_image(data, 1024, 85)
+
+    assert (image.width, image.height) == (1024, 512)
+    assert decode(image.data).size == (1024, 512)
+    assert image.mime_type == "image/jpeg"
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    # rotated 90 degrees, the stored pixels are landscape
+    exif[EXIF_ORIENTATION] = 6
+    data = encode(Image.new("RGB", (200, 100), "green"), "JPEG", exif=exif)
+
+    image = normalize_image(data, 1024, 85)
+
+    assert (image.width, image.height) == (100, 200)
+    assert decode(image.data).getexif().get(EXIF_ORIENTATION, 1) == 1
+
+
+@pytest.mark.parametrize("format", ["WEBP", "GIF"])
+def test_other_formats_are_reencoded_as_jpeg(format):
+    data = encode(Image.new("RGB", (64, 64), "yellow"), format)
+
+    image = normalize_image(data, 1024, 85)
+
+    assert image.source_format == format
+    assert image.mime_type == "image/jpeg"
+    assert decode(image.data).format == "JPEG"
+
+
+def test_transparency_is_kept_as_png():
+    data = encode(Image.new("RGBA", (64, 64), (0, 0, 0, 0)), "WEBP")
+
+    image = normalize_image(data, 1024, 85)
+
+    assert image.mime_type == "image/png"
+
+
+def test_rejects_data_that_is_not_an_image():
+    with pytest.raises(ImageProcessingError):
+        normalize_image(base64.b64encode(b"not an image").decode(), 1024, 85)
+
+
+def test_concurrent_requests_for_an_image_share_one_job(monkeypatch):
+    calls = []
+    started = threading.Event()
+
+    def slow_normalize(*args):
+        calls.append(args)
+        started.wait(1)
+        return normalize_image(*args)
+
+    with ThreadPoolExecutor(2) as pool:
+        monkeypatch.setattr(image_processing, "normalize_image", slow_normalize)
+        monkeypatch.setattr(image_processing, "get_image_pool", lambda config: pool)
+        data = encode(Image.new("RGB", (2000, 2000), "red"), "PNG")
+
+        async def main():
+            requests = [asyncio.create_task(prepare_image(data, MODEL)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            started.set()
+            first = await asyncio.gather(*requests)
+            again = await prepare_image(data, MODEL)
+            return first, again
+
+        images, cached = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert all(image is cached for image in images)
+    assert cached.width == 1024
+
+
+def test_recovers_from_a_crashed_worker_pool():
+    config = image_processing.read_image_processing_config()
+    data = encode(Image.new("RGB", (2000, 100), "red"), "PNG")
+
+    async def main():
+        pool = image_processing.get_image_pool(config)
+        # start the workers, then kill them as running out of memory would
+        await asyncio.get_running_loop().run_in_executor(pool, os.getpid)
+        for process in list(pool._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        image = await prepare_image(data, MODEL)
+        return pool, image
+
+    broken_pool, image = asyncio.run(main())
+
+    assert image.width == 1024
+    assert image_processing._pool is not broken_pool
+
+
+def test_a_pool_that_keeps_breaking_is_an_image_error(monkeypatch):
+    class BrokenPool(ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            raise BrokenProcessPool("worker died")
+
+    pools = []
+
+    def get_image_pool(config):
+        pools.append(BrokenPool(1))
+        return pools[-1]
+
+    monkeypatch.setattr(image_processing, "get_image_pool", get_image_pool)
+    data = encode(Image.new("RGB", (2000, 100), "red"), "PNG")
+
+    with pytest.raises(ImageProcessingError):
+        asyncio.run(prepare_image(data, MODEL))
+    assert len(pools) == 2
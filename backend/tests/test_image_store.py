@@ -0,0 +1,71 @@
+import io
+import os
+import time
+import pytest
+from utils.image_store import ImageStore, ImageTooLargeError
+
+
+def save(store: ImageStore, data: bytes) -> str:
+    image_id, _, _ = store.save(io.BytesIO(data))
+    return image_id
+
+
+def age(store: ImageStore, image_id: str, seconds: float) -> None:
+    last_used = time.time() - seconds
+    os.utime(store.path(image_id), (last_used, last_used))
+
+
+def test_same_content_is_stored_once(tmp_path):
+    store = ImageStore(tmp_path, max_bytes=1000)
+
+    first = store.save(io.BytesIO(b"a" * 10))
+    second = store.save(io.BytesIO(b"a" * 10))
+
+    assert first[0] == second[0]
+    assert (first[2], second[2]) == (True, False)
+    assert store.read_bytes(first[0]) == b"a" * 10
+
+
+def test_rejects_uploads_over_the_limit(tmp_path):
+    store = ImageStore(tmp_path, max_bytes=10)
+
+    with pytest.raises(ImageTooLargeError):
+        store.save(io.BytesIO(b"a" * 11))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_evicts_least_recently_used_images_over_budget(tmp_path):
+    store = ImageStore(tmp_path, max_bytes=1000, max_store_bytes=250)
+    first = save(store, b"a" * 100)
+    age(store, first, 30)
+    second = save(store, b"b" * 100)
+    age(store, second, 20)
+    # reading marks the first image as used more recently than the second
+    store.read_bytes(first)
+
+    third = save(store, b"c" * 100)
+
+    assert store.exists(first) and store.exists(third)
+    assert not store.exists(second)
+    assert store.evictions == 1
+
+
+def test_removes_expired_images(tmp_path):
+    store = ImageStore(tmp_path, max_bytes=1000, max_age_seconds=60)
+    old = save(store, b"a" * 10)
+    age(store, old, 120)
+    recent = save(store, b"b" * 10)
+    age(store, recent, 30)
+
+    new = save(store, b"c" * 10)
+
+    assert not store.exists(old)
+    assert store.exists(recent) and store.exists(new)
+
+
+def test_keeps_the_new_upload_even_when_it_alone_exceeds_the_budget(tmp_path):
+    store = ImageStore(tmp_path, max_bytes=1000, max_store_bytes=50)
+
+    image_id = save(store, b"a" * 100)
+
+    assert store.exists(image_id)
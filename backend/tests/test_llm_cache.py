@@ -0,0 +1,74 @@
+import asyncio
+import datetime
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from agent.llm_cache import LLMResponseCache
+from agent.prompt import user_message
+from agent.router import Route
+from agent.vea import VeaAgent
+
+NOW = datetime.datetime(2026, 1, 5, 9, 30, tzinfo=datetime.timezone.utc)
+
+
+class RecordingModel(FakeListChatModel):
+    prompts: list = []
+
+    async def ainvoke(self, messages, *args, **kwargs) -> AIMessage:
+        self.prompts.append(messages)
+        return await super().ainvoke(messages, *args, **kwargs)
+
+
+def route(tmp_path) -> Route:
+    llm = RecordingModel(responses=["first", "second"], prompts=[])
+    return Route(
+        name="default",
+        model_name="m",
+        llm=llm,
+        llm_with_tools=llm,
+        tools=[],
+        tool_schemas=[],
+        sampling_params={"temperature": 0},
+        reserved_tokens=0,
+        llm_cache=LLMResponseCache(tmp_path / "cache.sqlite3", max_bytes=1 << 20),
+    )
+
+
+def ask(cache_route: Route, query: str, sent_at: datetime.datetime) -> AIMessage:
+    # the agent's state isn't needed for answering a prompt
+    agent = object.__new__(VeaAgent)
+    return asyncio.run(agent.invoke_llm(cache_route, [user_message(query, sent_at)]))
+
+
+def test_same_turn_a_minute_later_is_a_hit(tmp_path):
+    cache_route = route(tmp_path)
+
+    first = ask(cache_route, "hi", NOW)
+    second = ask(cache_route, "hi", NOW + datetime.timedelta(minutes=1))
+
+    assert first.content == second.content == "first"
+    assert second.response_metadata["llm_cache_hit"]
+    assert cache_route.llm_cache.stats()["entries"] == 1
+    # the model still saw the send time
+    (prompt,) = cache_route.llm.prompts
+    assert prompt[-1].content == "[2026-01-05 09:30 UTC (Monday)] hi"
+
+
+def test_another_question_is_a_miss(tmp_path):
+    cache_route = route(tmp_path)
+
+    ask(cache_route, "hi", NOW)
+    other = ask(cache_route, "hello", NOW)
+
+    assert other.content == "second"
+    assert cache_route.llm_cache.stats()["entries"] == 2
+
+
+def test_same_question_on_another_day_is_a_miss(tmp_path):
+    cache_route = route(tmp_path)
+
+    ask(cache_route, "what's the date today?", NOW)
+    tomorrow = ask(cache_route, "what's the date today?", NOW + datetime.timedelta(days=1))
+
+    assert tomorrow.content == "second"
+    assert "llm_cache_hit" not in tomorrow.response_metadata
+    assert cache_route.llm_cache.stats()["entries"] == 2
@@ -0,0 +1,29 @@
+import logging
+from langchain_core.messages import HumanMessage
+from utils.log import RedactingFilter
+
+
+def record(msg: str, *args) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 1, msg, args, None)
+
+
+def test_redacts_image_payloads_and_truncates_long_strings():
+    log_filter = RedactingFilter(max_chars=10, redact_fields=["image_data"])
+    state = {"image_data": "a" * 5000, "query": "what is this?"}
+    entry = record("State %s, note %s", state, "b" * 50)
+
+    assert log_filter.filter(entry)
+
+    message = entry.getMessage()
+    assert "a" * 20 not in message
+    assert "<redacted 5000 chars>" in message
+    assert "bbbbbbbbbb... [50 chars]" in message
+
+
+def test_summarizes_message_lists():
+    log_filter = RedactingFilter(max_chars=100, redact_fields=[])
+    entry = record("State %s", {"messages": [HumanMessage(content="hi")] * 3})
+
+    log_filter.filter(entry)
+
+    assert "<3 messages>" in entry.getMessage()
@@ -0,0 +1,91 @@
+import time
+import pytest
+from tools.math import MAX_EXPRESSIONS, MAX_OPERATIONS, calculate
+
+
+def run(expressions: list[str], variables: dict | None = None) -> list[dict]:
+    args = {"expressions": expressions}
+    if variables is not None:
+        args["variables"] = variables
+    return calculate.invoke(args)
+
+
+def test_evaluates_steps_with_variables():
+    results = run(["principal = 1000", "rate = 0.05", "round(principal * (1 + rate) ** 10, 2)"])
+
+    assert [r["result"] for r in results] == [1000, 0.05, 1628.89]
+
+
+def test_list_variables_give_one_result_per_value():
+    results = run(["2 ** n"], {"n": [1, 2, 3]})
+
+    assert results[0]["result"] == [2, 4, 8]
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "__import__('os')",
+        "(1).real",
+        "[x for x in range(3)]",
+        "open('f')",
+        "a, b = 1, 2",
+        "lambda: 1",
+    ],
+)
+def test_rejects_anything_but_arithmetic(source):
+    assert "error" in run([source])[0]
+
+
+@pytest.mark.parametrize(
+    "expressions",
+    [
+        ["9 ** 100000"],
+        ["a = 9 ** 1000", "a = a * a", "a = a * a", "a = a * a", "a = a * a", "a = a * a"],
+        ["a = 2 ** 4000", "a * a * a"],
+        ["a = 2 ** 4000", "a + a * a * a"],
+        ["factorial(171)"],
+    ],
+)
+def test_rejects_results_that_are_too_large(expressions):
+    results = run(expressions)
+
+    assert "too large" in results[-1]["error"] or "factorial" in results[-1]["error"]
+
+
+def test_repeated_squaring_stops_quickly():
+    start = time.perf_counter()
+    results = run(["a = 9 ** 1000"] + ["a = a * a"] * 20)
+
+    assert time.perf_counter() - start < 1
+    assert "error" in results[-1]
+
+
+def test_rounding_to_huge_digit_counts_stops_quickly():
+    start = time.perf_counter()
+    results = run(["round(5, -100000000)", "round(5, 100000000)", "round(1234.5, -2)"])
+
+    assert time.perf_counter() - start < 1
+    assert "round()" in results[0]["error"] and "round()" in results[1]["error"]
+    assert results[2]["result"] == 1200
+
+
+def test_caps_the_number_of_expressions():
+    results = run(["1"] * (MAX_EXPRESSIONS + 1))
+
+    assert len(results) == 1 and "At most" in results[0]["error"]
+
+
+def test_caps_the_work_per_call():
+    expression = "+".join(["x * x"] * 100)
+    results = run([expression] * 50, {"x": [1.5] * 1000})
+
+    # every list row evaluates the whole expression
+    assert 50 * 1000 * 200 > MAX_OPERATIONS
+    assert "too long" in results[-1]["error"]
+
+
+def test_huge_integers_are_reported_in_scientific_notation():
+    results = run(["10 ** 400", "-(10 ** 400)", "2 ** 64"])
+
+    assert [r["result"] for r in results] == ["1e+400", "-1e+400", 2**64]
@@ -0,0 +1,99 @@
+import operator
+from typing import Annotated
+from typing_extensions import TypedDict
+from langgraph.graph import StateGraph, START, END
+from agent.memory import BoundedMemorySaver
+
+
+class State(TypedDict):
+    log: Annotated[list[str], operator.add]
+    image_data: str | None
+
+
+def build_graph(saver: BoundedMemorySaver):
+    builder = StateGraph(State)
+    builder.add_node("echo", lambda state: {"log": ["echo"]})
+    builder.add_edge(START, "echo")
+    builder.add_edge("echo", END)
+    return builder.compile(checkpointer=saver)
+
+
+def run_turn(graph, thread_id: str, text: str = "x" * 2000, image_data=None) -> dict:
+    return graph.invoke(
+        {"log": [text], "image_data": image_data},
+        {"configurable": {"thread_id": thread_id}},
+    )
+
+
+def threads(saver: BoundedMemorySaver) -> set[str]:
+    return set(saver.storage)
+
+
+def test_keeps_only_the_latest_checkpoints():
+    saver = BoundedMemorySaver(max_checkpoints=2, idle_ttl_seconds=None, max_bytes=None)
+    graph = build_graph(saver)
+    for _ in range(3):
+        state = run_turn(graph, "a", text="hi")
+
+    assert len(saver.storage["a"][""]) == 2
+    assert saver.pruned_checkpoints > 0
+    # the latest state is still complete
+    assert state["log"] == ["hi", "echo"] * 3
+
+
+def test_evicts_least_recently_used_thread_over_budget():
+    saver = BoundedMemorySaver(idle_ttl_seconds=None, max_bytes=None)
+    graph = build_graph(saver)
+    run_turn(graph, "a")
+    run_turn(graph, "b")
+    # room for two and a half threads of the same size
+    saver.max_bytes = saver.stats()["checkpoint_bytes"] * 5 // 4
+
+    run_turn(graph, "c")
+
+    assert threads(saver) == {"b", "c"}
+    assert saver.evictions == 1
+
+
+def test_never_evicts_a_thread_with_a_turn_in_progress():
+    saver = BoundedMemorySaver(idle_ttl_seconds=None, max_bytes=None)
+    graph = build_graph(saver)
+    run_turn(graph, "a")
+    run_turn(graph, "b")
+    # room for two and a half threads of the same size
+    saver.max_bytes = saver.stats()["checkpoint_bytes"] * 5 // 4
+
+    with saver.running("a"):
+        run_turn(graph, "c")
+        assert threads(saver) == {"a", "c"}
+
+    # finished threads are evictable again
+    run_turn(graph, "d")
+    assert "a" not in threads(saver)
+
+
+def test_evicts_idle_threads_behind_a_running_one():
+    saver = BoundedMemorySaver(idle_ttl_seconds=None, max_bytes=None)
+    graph = build_graph(saver)
+    run_turn(graph, "a")
+    run_turn(graph, "b")
+    saver.idle_ttl_seconds = 0
+
+    with saver.running("a"):
+        run_turn(graph, "c")
+
+    assert threads(saver) == {"a", "c"}
+
+
+def test_strips_image_payloads():
+    saver = BoundedMemorySaver(idle_ttl_seconds=None, max_bytes=None)
+    graph = build_graph(saver)
+    run_turn(graph, "a", image_data="aGVsbG8=" * 1000)
+
+    for checkpoint, _, _ in saver.storage["a"][""].values():
+        assert b"aGVsbG8=" not in checkpoint[1]
+    for writes in saver.writes.values():
+        for write in writes.values():
+            assert b"aGVsbG8=" not in write[2][1]
+    for key, blob in saver.blobs.items():
+        assert b"aGVsbG8=" not in blob[1], key
@@ -0,0 +1,140 @@
+import json
+from langchain_core.messages import ToolMessage
+from models.config import ToolExecutionConfig, ToolLimitsConfig, ToolOutputConfig
+from tools.projection import (
+    ELLIPSIS,
+    cap_content,
+    extract_snippet,
+    project_tool_message,
+    project_weather,
+    truncate,
+)
+
+WEATHER = {
+    "coord": {"lon": 2.35, "lat": 48.85},
+    "weather": [{"id": 500, "main": "Rain", "description": "light rain", "icon": "10d"}],
+    "main": {
+        "temp": 12.3,
+        "feels_like": 11.1,
+        "temp_min": 10,
+        "temp_max": 14,
+        "humidity": 80,
+        "pressure": 1012,
+    },
+    "visibility": 10000,
+    "wind": {"speed": 4.1, "deg": 220},
+    "clouds": {"all": 75},
+    "sys": {"country": "FR", "sunrise": 1700000000, "sunset": 1700030000},
+    "timezone": 3600,
+    "name": "Paris",
+    "cod": 200,
+}
+
+
+def tool_message(name: str, content, status: str = "success", args=None):
+    call = {"name": name, "args": args or {}, "id": "call-1", "type": "tool_call"}
+    return ToolMessage(content=content, tool_call_id="call-1", status=status), call
+
+
+def test_weather_keeps_the_readings():
+    compact = project_weather(WEATHER, {"units": "metric"}, ToolOutputConfig())
+
+    assert compact == {
+        "location": "Paris, FR",
+        "conditions": "light rain",
+        "temp": 12.3,
+        "feels_like": 11.1,
+        "humidity": "80%",
+        "pressure_hpa": 1012,
+        "wind": 4.1,
+        "wind_deg": 220,
+        "clouds": "75%",
+        "sunrise": "23:13",
+        "sunset": "07:33",
+        "units": "°C, m/s",
+    }
+
+
+def test_truncate_cuts_at_a_word_boundary():
+    assert truncate("short", 10) == "short"
+    assert truncate("the quick brown fox", 12) == f"the quick{ELLIPSIS}"
+
+
+def test_snippet_keeps_the_sentences_about_the_query_in_order():
+    text = (
+        "Paris is the capital of France. It has many museums. "
+        "The Louvre is the largest museum. Paris hosts the Louvre."
+    )
+
+    snippet = extract_snippet(text, "Louvre in Paris", 80)
+
+    assert snippet == f"Paris is the capital of France. {ELLIPSIS} Paris hosts the Louvre."
+    assert len(snippet) <= 80
+
+
+def test_snippet_without_query_words_is_truncated():
+    text = "Nothing relevant here at all. " * 5
+
+    assert extract_snippet(text, "weather", 20) == truncate(text, 20)
+
+
+def test_search_results_keep_title_url_and_snippet():
+    data = {
+        "query": "python",
+        "answer": "A language.",
+        "response_time": 1.2,
+        "images": ["x"],
+        "results": [
+            {
+                "title": "Python",
+                "url": "https://python.org",
+                "content": "word " * 200,
+                "score": 0.9,
+                "raw_content": "raw",
+            },
+        ],
+    }
+    config = ToolExecutionConfig(
+        output=ToolOutputConfig(snippet_mode="truncate", snippet_chars=50)
+    )
+    message, call = tool_message(
+        "tavily_search", json.dumps(data), args={"query": "python"}
+    )
+
+    projected = json.loads(project_tool_message(message, call, config).content)
+
+    assert projected.keys() == {"query", "answer", "results"}
+    (result,) = projected["results"]
+    assert result.keys() == {"title", "url", "content"}
+    assert len(result["content"]) <= 51
+
+
+def test_cap_content_says_how_much_was_cut():
+    assert cap_content("abc", 3) == "abc"
+    assert cap_content("abcdef", 4) == f"abcd{ELLIPSIS} [2 characters truncated]"
+
+
+def test_results_are_capped_per_tool():
+    config = ToolExecutionConfig(tools={"echo": ToolLimitsConfig(max_output_chars=10)})
+    message, call = tool_message("echo", "x" * 100)
+
+    capped = project_tool_message(message, call, config)
+
+    assert capped.content == f"{'x' * 10}{ELLIPSIS} [90 characters truncated]"
+    assert capped.tool_call_id == message.tool_call_id
+
+
+def test_errors_are_only_capped():
+    error = json.dumps({"error": "City not found", "cod": "404", "padding": "x" * 50})
+    config = ToolExecutionConfig(output=ToolOutputConfig(default_max_chars=40))
+    message, call = tool_message("fetch_weather_data", error, status="error")
+
+    capped = project_tool_message(message, call, config)
+
+    assert capped.content == cap_content(error, 40)
+
+
+def test_small_unprojected_results_are_kept_as_is():
+    message, call = tool_message("echo", "fine")
+
+    assert project_tool_message(message, call, ToolExecutionConfig()) is message
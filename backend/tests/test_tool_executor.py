@@ -0,0 +1,68 @@
+import asyncio
+import json
+import time
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from agent.tool_executor import ToolExecutor
+from models.config import ToolExecutionConfig, ToolLimitsConfig
+
+
+@tool
+async def nap(seconds: float) -> str:
+    """Sleeps for a while."""
+    await asyncio.sleep(seconds)
+    return f"slept {seconds}"
+
+
+@tool
+def explode() -> str:
+    """Always fails."""
+    raise RuntimeError("boom")
+
+
+def run(config: ToolExecutionConfig, *tool_calls: tuple[str, dict]) -> list:
+    executor = ToolExecutor([nap, explode], config)
+    message = AIMessage(
+        content="",
+        tool_calls=[
+            {"name": name, "args": args, "id": str(index)}
+            for index, (name, args) in enumerate(tool_calls)
+        ],
+    )
+    result = asyncio.run(executor({"messages": [message]}, {}))
+    return result["messages"]
+
+
+def test_runs_tool_calls_concurrently_in_order():
+    start = time.perf_counter()
+    messages = run(ToolExecutionConfig(), ("nap", {"seconds": 0.2}), ("nap", {"seconds": 0.1}))
+
+    assert time.perf_counter() - start < 0.35
+    assert [m.tool_call_id for m in messages] == ["0", "1"]
+    assert [m.content for m in messages] == ["slept 0.2", "slept 0.1"]
+
+
+def test_failures_become_error_results():
+    messages = run(
+        ToolExecutionConfig(tools={"nap": ToolLimitsConfig(timeout_seconds=0.05)}),
+        ("nap", {"seconds": 1}),
+        ("explode", {}),
+        ("missing", {}),
+        ("nap", {"seconds": 0}),
+    )
+
+    errors = [json.loads(m.content)["error"] for m in messages[:3]]
+    assert errors == ["timeout", "failed", "unknown_tool"]
+    assert all(m.status == "error" for m in messages[:3])
+    assert messages[3].status == "success"
+
+
+def test_turn_deadline_cancels_pending_calls():
+    messages = run(
+        ToolExecutionConfig(turn_timeout_seconds=0.1),
+        ("nap", {"seconds": 5}),
+        ("nap", {"seconds": 0}),
+    )
+
+    assert json.loads(messages[0].content)["error"] == "cancelled"
+    assert messages[1].content == "slept 0.0"
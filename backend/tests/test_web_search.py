@@ -0,0 +1,39 @@
+import asyncio
+from benchmarks.stubs import StubWebSearch
+from tools.web_search import create_web_search_tool
+
+
+def test_sync_and_async_searches_share_the_cache():
+    search = create_web_search_tool(backend=StubWebSearch(latency_seconds=0))
+
+    first = search.invoke({"query": "Python 3.13 release?"})
+    second = asyncio.run(search.ainvoke({"query": "  python 3.13 RELEASE "}))
+
+    assert first == second
+    assert search.stats()["hits"] == 1
+
+
+def test_freshness_class_picks_the_ttl():
+    search = create_web_search_tool(
+        backend=StubWebSearch(latency_seconds=0),
+        default_ttl_seconds=3600,
+        freshness_ttl_seconds={"news": 600, "day": 60},
+    )
+
+    assert search.ttl_for(topic="news") == 600
+    assert search.ttl_for(topic="news", time_range="day") == 60
+    assert search.ttl_for(topic="general") == 3600
+
+
+def test_concurrent_searches_are_coalesced():
+    search = create_web_search_tool(backend=StubWebSearch(latency_seconds=0.05))
+
+    async def both():
+        return await asyncio.gather(
+            search.ainvoke({"query": "weather"}), search.ainvoke({"query": "weather"})
+        )
+
+    first, second = asyncio.run(both())
+
+    assert first == second
+    assert search.stats()["coalesced"] == 1
@@ -1,11 +1,14 @@
 from .weather import fetch_weather_data
 from .vision_llm import use_vision_llm
-from .math import calculator, trig_functions
+from .math import calculate
+from .web_search import CachedWebSearch, create_web_search_tool, get_web_search_tool
 
 
 __all__ = [
     "fetch_weather_data",
     "use_vision_llm",
-    "calculator",
-    "trig_functions",
+    "calculate",
+    "CachedWebSearch",
+    "create_web_search_tool",
+    "get_web_search_tool",
 ]
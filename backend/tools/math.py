@@ -1,50 +1,272 @@
-from typing import Literal
-from langchain_core.tools import tool
+import ast
 import math
+import operator
+from typing import Any, Callable, Literal, Optional, Union
+from langchain_core.tools import tool
+
+
+MAX_EXPRESSION_LENGTH = 1000
+MAX_EXPRESSIONS = 100
+MAX_EXPONENT = 10_000
+# bounds the cost of every integer operation, about 3000 decimal digits
+MAX_INTEGER_BITS = 10_000
+# evaluated syntax nodes per call, across all expressions and list rows
+MAX_OPERATIONS = 100_000
+MAX_FACTORIAL = 170
+# beyond the digits of any float, rounding an integer to 10**-n builds 10**n
+MAX_ROUND_DIGITS = 308
+MAX_ROWS = 1000
+# integers beyond this are reported in scientific notation
+MAX_EXACT_BITS = 1000
+SIGNIFICANT_DIGITS = 16
+
+Number = Union[int, float]
+
+BINARY_OPERATORS: dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+UNARY_OPERATORS: dict[type, Callable[[Any], Any]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+
+
+def _result_bits(op: type, left: Number, right: Number) -> int:
+    """Upper bound of the bit length of an integer operation's result."""
+    if not (isinstance(left, int) and isinstance(right, int)):
+        return 0
+    if op is ast.Mult:
+        return left.bit_length() + right.bit_length()
+    if op in (ast.Add, ast.Sub):
+        return max(left.bit_length(), right.bit_length()) + 1
+    # division and modulo never grow their operands
+    return max(left.bit_length(), right.bit_length())
+
+
+def _check_size(value: Any) -> Any:
+    if isinstance(value, int) and value.bit_length() > MAX_INTEGER_BITS:
+        raise ValueError("Result is too large.")
+    return value
+
+
+def _power(base: Number, exponent: Number) -> Number:
+    if abs(exponent) > MAX_EXPONENT:
+        raise ValueError(f"Exponent {exponent} is too large.")
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+        if base.bit_length() * exponent > MAX_INTEGER_BITS:
+            raise ValueError("Result is too large.")
+    return math.pow(base, exponent) if isinstance(exponent, float) else base**exponent
+
+
+def _factorial(n: Number) -> int:
+    if n != int(n) or not 0 <= n <= MAX_FACTORIAL:
+        raise ValueError(f"factorial() needs an integer between 0 and {MAX_FACTORIAL}.")
+    return math.factorial(int(n))
+
+
+def _round(x: Number, ndigits: Optional[int] = None) -> Number:
+    if ndigits is not None and abs(ndigits) > MAX_ROUND_DIGITS:
+        raise ValueError(
+            f"round() needs digits between -{MAX_ROUND_DIGITS} and {MAX_ROUND_DIGITS}."
+        )
+    return _check_size(round(x, ndigits))
+
+
+def _log(x: Number, base: Optional[Number] = None) -> float:
+    return math.log(x) if base is None else math.log(x, base)
+
+
+def _functions(mode: Literal["radians", "degrees"]) -> dict[str, Callable[..., Number]]:
+    """Returns the callable functions, trigonometry follows the angle mode."""
+    to_radians = math.radians if mode == "degrees" else (lambda x: x)
+    from_radians = math.degrees if mode == "degrees" else (lambda x: x)
+
+    return {
+        "sqrt": math.sqrt,
+        "cbrt": lambda x: math.copysign(abs(x) ** (1 / 3), x),
+        "exp": math.exp,
+        "log": _log,
+        "ln": math.log,
+        "log10": math.log10,
+        "log2": math.log2,
+        "pow": _power,
+        "abs": abs,
+        "round": _round,
+        "floor": math.floor,
+        "ceil": math.ceil,
+        "trunc": math.trunc,
+        "min": min,
+        "max": max,
+        "hypot": math.hypot,
+        "factorial": _factorial,
+        "sin": lambda x: math.sin(to_radians(x)),
+        "cos": lambda x: math.cos(to_radians(x)),
+        "tan": lambda x: math.tan(to_radians(x)),
+        "asin": lambda x: from_radians(math.asin(x)),
+        "acos": lambda x: from_radians(math.acos(x)),
+        "atan": lambda x: from_radians(math.atan(x)),
+        "atan2": lambda y, x: from_radians(math.atan2(y, x)),
+        "sinh": math.sinh,
+        "cosh": math.cosh,
+        "tanh": math.tanh,
+        "degrees": math.degrees,
+        "radians": math.radians,
+    }
+
+
+class SafeEvaluator:
+    """Evaluates arithmetic expressions by walking their AST.
+
+    Only numeric literals, variables, arithmetic operators and whitelisted functions are
+    allowed; attribute access, subscripts, comprehensions and arbitrary calls are rejected.
+    """
+
+    def __init__(
+        self,
+        variables: dict[str, Number],
+        mode: Literal["radians", "degrees"],
+        budget: Optional[list[int]] = None,
+    ):
+        self.variables = variables
+        self.functions = _functions(mode)
+        # remaining operations, shared by the evaluators of one call
+        self.budget = budget if budget is not None else [MAX_OPERATIONS]
+
+    def run(self, source: str) -> Number:
+        """Evaluates one statement, `name = expression` assigns a variable for later statements."""
+        if len(source) > MAX_EXPRESSION_LENGTH:
+            raise ValueError("Expression is too long.")
+
+        tree = ast.parse(source.strip(), mode="exec")
+        if len(tree.body) != 1:
+            raise ValueError("Expected a single expression or assignment.")
+
+        statement = tree.body[0]
+        if isinstance(statement, ast.Expr):
+            return self.eval(statement.value)
+        if (
+            isinstance(statement, ast.Assign)
+            and len(statement.targets) == 1
+            and isinstance(statement.targets[0], ast.Name)
+        ):
+            name = statement.targets[0].id
+            if name in self.functions or name in CONSTANTS:
+                raise ValueError(f"Cannot assign to reserved name '{name}'.")
+            value = self.eval(statement.value)
+            self.variables[name] = value
+            return value
+        raise ValueError("Expected a single expression or assignment.")
+
+    def eval(self, node: ast.AST) -> Number:
+        self.budget[0] -= 1
+        if self.budget[0] < 0:
+            raise ValueError("Calculation is too long, split it into fewer steps.")
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return node.value
+        if isinstance(node, ast.Name):
+            if node.id in self.variables:
+                return self.variables[node.id]
+            if node.id in CONSTANTS:
+                return CONSTANTS[node.id]
+            raise ValueError(f"Unknown variable '{node.id}'.")
+        if isinstance(node, ast.BinOp):
+            left, right = self.eval(node.left), self.eval(node.right)
+            if isinstance(node.op, ast.Pow):
+                return _power(left, right)
+            if type(node.op) in BINARY_OPERATORS:
+                # checked before computing, a huge product costs seconds of CPU
+                if _result_bits(type(node.op), left, right) > MAX_INTEGER_BITS + 1:
+                    raise ValueError("Result is too large.")
+                return _check_size(BINARY_OPERATORS[type(node.op)](left, right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+            return UNARY_OPERATORS[type(node.op)](self.eval(node.operand))
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id in self.functions
+            and not node.keywords
+        ):
+            args = [self.eval(arg) for arg in node.args]
+            return _check_size(self.functions[node.func.id](*args))
+        raise ValueError(f"Unsupported syntax: {ast.unparse(node)}")
+
+
+def _rows(variables: dict[str, Union[Number, list[Number]]]) -> list[dict[str, Number]]:
+    """Expands list-valued variables into one set of scalar variables per element."""
+    lengths = {len(v) for v in variables.values() if isinstance(v, list)}
+    if not lengths:
+        return [dict(variables)]
+    if len(lengths) > 1:
+        raise ValueError("List variables must all have the same length.")
+
+    length = lengths.pop()
+    if length > MAX_ROWS:
+        raise ValueError(f"At most {MAX_ROWS} values per list variable are supported.")
+    return [
+        {k: v[i] if isinstance(v, list) else v for k, v in variables.items()}
+        for i in range(length)
+    ]
+
+
+def _format(value: Number) -> Number | str:
+    if isinstance(value, int) and value.bit_length() > MAX_EXACT_BITS:
+        # beyond float range, e.g. 10**400, so rounded in scientific notation instead
+        digits = str(abs(value))
+        mantissa = f"{digits[0]}.{digits[1:SIGNIFICANT_DIGITS]}".rstrip("0").rstrip(".")
+        return f"{'-' if value < 0 else ''}{mantissa}e+{len(digits) - 1}"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 2**53:
+        return int(value)
+    return value
+
+
+@tool("calculate")
+def calculate(
+    expressions: list[str],
+    variables: Optional[dict[str, Union[float, list[float]]]] = None,
+    angle_mode: Literal["radians", "degrees"] = "degrees",
+) -> list[dict]:
+    """Evaluate one or more math expressions in a single call. Prefer one call with every step over many small calls.
+
+    Expressions run in order and may assign variables for later ones, e.g.
+    ["principal = 1000", "rate = 0.05", "principal * (1 + rate) ** 10"].
+    Supports + - * / // % **, parentheses, the constants pi, e and tau, and the functions
+    sqrt, cbrt, exp, log(x[, base]), ln, log10, log2, pow, abs, round(x[, digits]), floor, ceil,
+    trunc, min, max, hypot, factorial, sin, cos, tan, asin, acos, atan, atan2, sinh, cosh, tanh,
+    degrees and radians. Trigonometric functions use `angle_mode` (degrees by default).
+
+    Args:
+        expressions: Expressions or assignments to evaluate in order.
+        variables: Initial variables. A list value evaluates every expression once per element,
+            e.g. {"years": [1, 5, 10]} gives one result per year.
+        angle_mode: Angle unit for trigonometric functions, 'degrees' or 'radians'.
+
+    Returns:
+        One entry per expression with its result (a list when evaluated over list variables) or an error.
+    """
+    if len(expressions) > MAX_EXPRESSIONS:
+        return [{"error": f"At most {MAX_EXPRESSIONS} expressions per call are supported."}]
+    try:
+        rows = _rows(variables or {})
+    except ValueError as e:
+        return [{"error": str(e)}]
+
+    budget = [MAX_OPERATIONS]
+    evaluators = [SafeEvaluator(row, angle_mode, budget) for row in rows]
+    vectorized = any(isinstance(v, list) for v in (variables or {}).values())
 
+    results = []
+    for expression in expressions:
+        try:
+            values = [_format(evaluator.run(expression)) for evaluator in evaluators]
+            result = values if vectorized else values[0]
+            results.append({"expression": expression, "result": result})
+        except (ArithmeticError, ValueError, TypeError, SyntaxError) as e:
+            results.append({"expression": expression, "error": str(e)})
 
-@tool("basic_calculator")
-def calculator(
-    x: float,
-    y: float,
-    operation: Literal["add", "subtract", "multiply", "divide", "modulo"],
-) -> float:
-    """Perform basic arithmetic operations, including addition, subtraction, multiplication, division, and modulo."""
-    if operation == "add":
-        result = x + y
-    elif operation == "subtract":
-        result = x - y
-    elif operation == "multiply":
-        result = x * y
-    elif operation == "divide":
-        if y == 0:
-            raise ValueError("Cannot divide by zero.")
-        result = x / y
-    elif operation == "modulo":
-        if y == 0:
-            raise ValueError("Cannot perform modulo by zero.")
-        result = x % y
-
-    return result
-
-
-@tool("trig_functions")
-def trig_functions(
-    x: float,
-    operation: Literal["sin", "cos", "tan"],
-    mode: Literal["radians", "degrees"] = "degrees",
-) -> float:
-    """Perform trigonometric functions: sine, cosine, and tangent."""
-    if mode == "degrees":
-        x_rad = math.radians(x)
-    else:
-        x_rad = x
-
-    if operation == "sin":
-        result = math.sin(x_rad)
-    elif operation == "cos":
-        result = math.cos(x_rad)
-    elif operation == "tan":
-        result = math.tan(x_rad)
-
-    return result
+    return results
@@ -0,0 +1,189 @@
+import datetime
+import json
+import logging
+import re
+from typing import Any, Callable
+from langchain_core.messages import ToolCall, ToolMessage
+from models.config import ToolExecutionConfig, ToolOutputConfig
+from utils.metrics import TOOL_OUTPUT_CHARS
+
+
+logger = logging.getLogger("backend.tools.projection")
+
+UNITS = {
+    "metric": "°C, m/s",
+    "imperial": "°F, mph",
+}
+# OpenWeatherMap reports this when visibility is unlimited
+MAX_VISIBILITY_M = 10000
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+WORD = re.compile(r"\w+")
+# query words this short carry no meaning for picking sentences
+MIN_KEYWORD_CHARS = 3
+ELLIPSIS = "…"
+
+
+def local_time(timestamp: int | None, offset_seconds: int) -> str | None:
+    if timestamp is None:
+        return None
+    tz = datetime.timezone(datetime.timedelta(seconds=offset_seconds))
+    return datetime.datetime.fromtimestamp(timestamp, tz).strftime("%H:%M")
+
+
+def project_weather(data: Any, args: dict, config: ToolOutputConfig) -> Any:
+    """Keeps the readings of an OpenWeatherMap response, without ids, coordinates and codes.
+
+    The min and max temperatures are dropped, they are the spread across the city right
+    now rather than the day's forecast and models tend to read them as the latter.
+    """
+    if not isinstance(data, dict) or "error" in data:
+        return data
+    main = data.get("main") or {}
+    wind = data.get("wind") or {}
+    sys = data.get("sys") or {}
+    offset = data.get("timezone") or 0
+    visibility = data.get("visibility")
+    compact = {
+        "location": ", ".join(filter(None, [data.get("name"), sys.get("country")])),
+        "conditions": ", ".join(
+            weather["description"]
+            for weather in data.get("weather") or []
+            if weather.get("description")
+        ),
+        "temp": main.get("temp"),
+        "feels_like": main.get("feels_like"),
+        "humidity": f"{main['humidity']}%" if "humidity" in main else None,
+        "pressure_hpa": main.get("pressure"),
+        "wind": wind.get("speed"),
+        "gusts": wind.get("gust"),
+        "wind_deg": wind.get("deg"),
+        "clouds": f"{data['clouds']['all']}%" if "all" in (data.get("clouds") or {}) else None,
+        "visibility_m": visibility if visibility != MAX_VISIBILITY_M else None,
+        "rain_mm_1h": (data.get("rain") or {}).get("1h"),
+        "snow_mm_1h": (data.get("snow") or {}).get("1h"),
+        "sunrise": local_time(sys.get("sunrise"), offset),
+        "sunset": local_time(sys.get("sunset"), offset),
+        "units": UNITS.get(args.get("units") or "metric"),
+    }
+    return {key: value for key, value in compact.items() if value not in (None, "")}
+
+
+def truncate(text: str, max_chars: int) -> str:
+    """Cuts the text at the last word boundary within `max_chars`."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    if text[max_chars].isalnum() and " " in cut:
+        # don't end on half a word
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip(" ,;:") + ELLIPSIS
+
+
+def extract_snippet(text: str, query: str, max_chars: int) -> str:
+    """Keeps the sentences sharing the most words with the query, in their original order.
+
+    Falls back to truncating when no sentence mentions a query word.
+    """
+    if len(text) <= max_chars:
+        return text
+    keywords = {
+        word for word in WORD.findall(query.lower()) if len(word) >= MIN_KEYWORD_CHARS
+    }
+    # pages often repeat themselves, e.g. a teaser and the article
+    sentences = list(dict.fromkeys(SENTENCE_END.split(text.strip())))
+    scores = [
+        len(keywords & set(WORD.findall(sentence.lower()))) for sentence in sentences
+    ]
+    if not any(scores):
+        return truncate(text, max_chars)
+
+    chosen, used = set(), 0
+    for index in sorted(range(len(sentences)), key=lambda i: (-scores[i], i)):
+        if scores[index] == 0:
+            break
+        length = len(sentences[index]) + 1
+        if used + length > max_chars:
+            continue
+        chosen.add(index)
+        used += length
+    if not chosen:
+        # the best sentence alone is too long
+        best = max(range(len(sentences)), key=lambda i: (scores[i], -i))
+        return truncate(sentences[best], max_chars)
+
+    parts, previous = [], None
+    for index in sorted(chosen):
+        if previous is not None and index != previous + 1:
+            parts.append(ELLIPSIS)
+        parts.append(sentences[index])
+        previous = index
+    return " ".join(parts)
+
+
+def project_search(data: Any, args: dict, config: ToolOutputConfig) -> Any:
+    """Keeps the answer and each result's title, URL and a snippet of its content.
+
+    Scores, raw page content, images and timings are dropped.
+    """
+    if not isinstance(data, dict) or "error" in data:
+        return data
+    query = args.get("query") or data.get("query") or ""
+    results = []
+    for result in data.get("results") or []:
+        content = result.get("content") or ""
+        if config.snippet_mode == "extract":
+            content = extract_snippet(content, query, config.snippet_chars)
+        else:
+            content = truncate(content, config.snippet_chars)
+        results.append(
+            {"title": result.get("title"), "url": result.get("url"), "content": content}
+        )
+    compact = {"query": data.get("query") or query}
+    if data.get("answer"):
+        compact["answer"] = data["answer"]
+    compact["results"] = results
+    return compact
+
+
+# keyed by tool name, see the tool definitions and web_search.py for the raw payloads
+PROJECTIONS: dict[str, Callable[[Any, dict, ToolOutputConfig], Any]] = {
+    "fetch_weather_data": project_weather,
+    "tavily_search": project_search,
+}
+
+
+def cap_content(content: str, max_chars: int) -> str:
+    """Cuts the content to `max_chars`, saying how much was left out."""
+    if len(content) <= max_chars:
+        return content
+    return f"{content[:max_chars]}{ELLIPSIS} [{len(content) - max_chars} characters truncated]"
+
+
+def project_tool_message(
+    message: ToolMessage, tool_call: ToolCall, config: ToolExecutionConfig
+) -> ToolMessage:
+    """Returns the message with a compact projection of its tool's result, capped in size.
+
+    Tool results stay in the conversation and are part of the prompt of every later
+    call, so only what the model needs to answer is kept. Errors are only capped.
+    """
+    if not isinstance(message.content, str):
+        return message
+    name = tool_call["name"]
+    content = message.content
+    projection = PROJECTIONS.get(name) if config.output.project else None
+    if projection is not None and message.status != "error":
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            logger.debug("Result of %s is not JSON, not projecting it", name)
+        else:
+            projected = projection(data, tool_call["args"], config.output)
+            content = json.dumps(projected, ensure_ascii=False, separators=(",", ":"))
+    content = cap_content(content, config.max_output_chars_for(name))
+
+    TOOL_OUTPUT_CHARS.labels(name, "raw").observe(len(message.content))
+    TOOL_OUTPUT_CHARS.labels(name, "kept").observe(len(content))
+    if content == message.content:
+        return message
+    return message.model_copy(update={"content": content})
@@ -1,13 +1,50 @@
+import asyncio
+import logging
+from langchain_core.language_models import BaseChatModel
 from langchain_core.tools import tool
 from langchain.chat_models import init_chat_model
+from utils.admission import DEFAULT_PRIORITY, get_admission_controller
+from utils.config import read_ollama_config
+from utils.image_processing import ImageProcessingError, prepare_image
+
+
+logger = logging.getLogger("backend.tools.vision_llm")
+
+# initialized clients keyed by model name and init params, building a client is not free
+_vision_clients: dict[tuple, BaseChatModel] = {}
+
+
+def get_vision_client(model_name: str, **params) -> BaseChatModel:
+    """Returns a cached vision client for the model and params, initializing it on first use."""
+    params = {k: v for k, v in params.items() if v is not None}
+    if model_name.startswith("ollama:"):
+        # kept loaded between requests like the tool model
+        params.setdefault("keep_alive", read_ollama_config().keep_alive)
+    key = (model_name, tuple(sorted(params.items())))
+    if key not in _vision_clients:
+        logger.info("Initializing vision client for %s with params %s", model_name, params)
+        _vision_clients[key] = init_chat_model(model_name, **params)
+    return _vision_clients[key]
 
 
 @tool("use_vision_llm", return_direct=True)
-def use_vision_llm(
-    query: str, image_data: str, model_name: str = "ollama:gemma3:4b"
+async def use_vision_llm(
+    query: str,
+    image_data: str,
+    model_name: str = "ollama:gemma3:4b",
+    temperature: float | None = None,
+    timeout: float = 120,
+    max_concurrency: int = 2,
+    priority: int = DEFAULT_PRIORITY,
 ) -> str:
     """Use a vision LLM to extract information on an image."""
-    vlm = init_chat_model(model_name)
+    vlm = get_vision_client(model_name, temperature=temperature)
+    try:
+        # downscaled to what the model looks at, with its real MIME type
+        image = await prepare_image(image_data, model_name)
+    except ImageProcessingError as e:
+        logger.warning("Could not prepare image for %s: %s", model_name, e)
+        return f"Sorry, the image could not be read ({e}). Please upload a JPEG, PNG or WebP image."
 
     system_message = {
         "role": "system",
@@ -28,13 +65,21 @@ def use_vision_llm(
             {
                 "type": "image",
                 "source_type": "base64",
-                "data": image_data,
-                "mime_type": "image/jpeg",
+                "data": image.data,
+                "mime_type": image.mime_type,
             },
         ],
     }
-    
-    # Pass both messages to the model
-    response = vlm.invoke([system_message, user_message])
-    
+
+    # Pass both messages to the model once admitted, max_concurrency applies unless the
+    # admission config overrides it and the timeout covers the generation only
+    admission = get_admission_controller(model_name, max_concurrency)
+    try:
+        async with admission.admit(priority):
+            async with asyncio.timeout(timeout):
+                response = await vlm.ainvoke([system_message, user_message])
+    except TimeoutError:
+        logger.warning("Vision model %s timed out after %s seconds", model_name, timeout)
+        return f"Sorry, the vision model did not respond within {timeout:g} seconds. Please try again."
+
     return response.text()
@@ -1,13 +1,72 @@
+import functools
+import logging
 import os
-import requests
+import httpx
 from typing import Literal, Optional
 from dotenv import load_dotenv
 from langchain_core.tools import tool
+from utils.cache import MISSING, SingleFlight, TTLCache
+from utils.config import read_weather_config
 
 load_dotenv()
 
+logger = logging.getLogger("backend.tools.weather")
+
+
+@functools.cache
+def get_weather_cache() -> TTLCache:
+    config = read_weather_config()
+    return TTLCache(maxsize=config.cache_size, ttl=config.cache_ttl_seconds)
+
+
+_single_flight = SingleFlight()
+_client: httpx.AsyncClient | None = None
+
+
+def get_weather_client() -> httpx.AsyncClient:
+    """Returns the shared pooled HTTP client, connections are reused across calls."""
+    global _client
+    if _client is None or _client.is_closed:
+        config = read_weather_config()
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                config.timeout_seconds, connect=config.connect_timeout_seconds
+            ),
+            limits=httpx.Limits(max_connections=config.max_connections),
+        )
+    return _client
+
+
+async def close_weather_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def build_location_query(
+    city: str, country: Optional[str] = None, state: Optional[str] = None
+) -> str:
+    """Builds the normalized OpenWeatherMap location query, e.g. "cambridge,ma,us"."""
+    city = city.strip().lower()
+    country = country.strip().lower() if country else None
+    state = state.strip().lower() if state else None
+
+    if "," in city:
+        # Handle comma-separated format: "Cambridge,MA,US"
+        return ",".join(part.strip() for part in city.split(","))
+    elif country and state:
+        # US city with state: "Cambridge,MA,US"
+        return f"{city},{state},{country}"
+    elif country:
+        # City with country: "Cambridge,GB"
+        return f"{city},{country}"
+    # Just city name (may be ambiguous)
+    return city
+
+
 @tool("fetch_weather_data")
-def fetch_weather_data(
+async def fetch_weather_data(
     city: str,
     country: Optional[str] = None,
     state: Optional[str] = None,
@@ -33,34 +92,36 @@ def fetch_weather_data(
         fetch_weather_data("Cambridge", "GB")        # Cambridge, United Kingdom
         fetch_weather_data("Cambridge,MA,US")        # Alternative single-string format
     """
-    base_url = "http://api.openweathermap.org/data/2.5/weather"
-
-    # Build the query string based on provided parameters
-    if "," in city:
-        # Handle comma-separated format: "Cambridge,MA,US"
-        query = city
-    elif country and state:
-        # US city with state: "Cambridge,MA,US"
-        query = f"{city},{state},{country}"
-    elif country:
-        # City with country: "Cambridge,GB"
-        query = f"{city},{country}"
-    else:
-        # Just city name (may be ambiguous)
-        query = city
+    api_key = os.environ.get("OPENWEATHER_API_KEY")
 
-    params = {"q": query, "appid": os.environ.get("OPENWEATHER_API_KEY"), "units": units}
-    
     # Check if API key is available
-    if not params["appid"]:
+    if not api_key:
         return {"error": "OPENWEATHER_API_KEY environment variable not set"}
 
-    try:
-        response = requests.get(base_url, params=params)
+    query = build_location_query(city, country, state)
+    key = (query, units)
+
+    cache = get_weather_cache()
+    cached = cache.get(key)
+    if cached is not MISSING:
+        logger.debug("Weather cache hit for %s", key)
+        return cached
+
+    async def fetch() -> dict:
+        base_url = os.environ.get("OPENWEATHER_BASE_URL") or read_weather_config().base_url
+        params = {"q": query, "appid": api_key, "units": units}
+        response = await get_weather_client().get(base_url, params=params)
         response.raise_for_status()
         data = response.json()
+        cache.set(key, data)
         return data
-    except requests.exceptions.RequestException as e:
-        return {"error": f"Request failed: {e}"}
-    except KeyError:
-        return {"error": "OPENWEATHER_API_KEY environment variable not set"}
+
+    try:
+        return await _single_flight.do(key, fetch)
+    except httpx.HTTPStatusError as e:
+        # the request URL carries the API key, keep it out of the message
+        logger.warning("Weather request for %s failed with status %d", query, e.response.status_code)
+        return {"error": f"Request failed with status {e.response.status_code}"}
+    except httpx.HTTPError as e:
+        logger.warning("Weather request for %s failed: %r", query, e)
+        return {"error": f"Request failed: {e!r}"}
@@ -0,0 +1,131 @@
+import functools
+import json
+import logging
+import os
+import re
+from typing import Any, Hashable
+from dotenv import load_dotenv
+from langchain_core.tools import BaseTool
+from langchain_tavily import TavilySearch
+from pydantic import Field
+from utils.cache import MISSING, SingleFlight, TTLCache
+from utils.config import read_web_search_config
+
+load_dotenv()
+
+logger = logging.getLogger("backend.tools.web_search")
+
+DEFAULT_TTL_SECONDS = 3600
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation so near-duplicates share an entry."""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip("?!. ")
+
+
+class CachedWebSearch(BaseTool):
+    """Caching wrapper around a web search tool.
+
+    Exposes the backend's name, description and argument schema unchanged, so the model
+    sees the same tool. Results are cached per normalized query and arguments with a
+    TTL chosen by freshness class (the `topic` and `time_range` arguments), and
+    concurrent identical searches share one backend call. Any BaseTool with the same
+    arguments can serve as the backend, e.g. a local fake in offline tests.
+    """
+
+    backend: BaseTool
+    cache: TTLCache = Field(default_factory=lambda: TTLCache(maxsize=512))
+    default_ttl_seconds: float = DEFAULT_TTL_SECONDS
+    # freshness class (topic or time_range value) -> TTL, the shortest matching TTL wins
+    freshness_ttl_seconds: dict[str, float] = Field(default_factory=dict)
+    single_flight: SingleFlight = Field(default_factory=SingleFlight)
+
+    def __init__(self, backend: BaseTool, **kwargs: Any):
+        super().__init__(
+            backend=backend,
+            name=backend.name,
+            description=backend.description,
+            args_schema=backend.args_schema,
+            handle_tool_error=backend.handle_tool_error,
+            **kwargs,
+        )
+
+    def cache_key(self, query: str, **kwargs: Any) -> Hashable:
+        args = {k: v for k, v in kwargs.items() if v is not None}
+        return normalize_query(query), json.dumps(args, sort_keys=True, default=str)
+
+    def ttl_for(self, **kwargs: Any) -> float:
+        ttls = [
+            self.freshness_ttl_seconds[value]
+            for value in (kwargs.get("topic"), kwargs.get("time_range"))
+            if value in self.freshness_ttl_seconds
+        ]
+        return min(ttls, default=self.default_ttl_seconds)
+
+    def stats(self) -> dict[str, int]:
+        return {**self.cache.stats(), "coalesced": self.single_flight.coalesced}
+
+    def _store(self, key: Hashable, result: Any, **kwargs: Any) -> None:
+        # errors are returned as {"error": ...} and must not be cached
+        if isinstance(result, dict) and "error" in result:
+            return
+        self.cache.set(key, result, ttl=self.ttl_for(**kwargs))
+
+    def _run(self, query: str, run_manager=None, **kwargs: Any) -> Any:
+        key = self.cache_key(query, **kwargs)
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            logger.debug("Web search cache hit for %s", key)
+            return cached
+
+        result = self.backend.invoke({"query": query, **kwargs})
+        self._store(key, result, **kwargs)
+        return result
+
+    async def _arun(self, query: str, run_manager=None, **kwargs: Any) -> Any:
+        key = self.cache_key(query, **kwargs)
+        cached = self.cache.get(key)
+        if cached is not MISSING:
+            logger.debug("Web search cache hit for %s", key)
+            return cached
+
+        async def search() -> Any:
+            logger.info("Web search cache miss, querying backend for %r", query)
+            result = await self.backend.ainvoke({"query": query, **kwargs})
+            self._store(key, result, **kwargs)
+            return result
+
+        return await self.single_flight.do(key, search)
+
+
+def create_web_search_tool(
+    backend: BaseTool | None = None,
+    max_results: int = 2,
+    cache_size: int = 512,
+    default_ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    freshness_ttl_seconds: dict[str, float] | None = None,
+) -> CachedWebSearch:
+    """Creates the cached web search tool, backed by Tavily unless another backend is given."""
+    if backend is None:
+        backend = TavilySearch(
+            max_results=max_results, api_key=os.getenv("TAVILY_API_KEY")
+        )
+    return CachedWebSearch(
+        backend,
+        cache=TTLCache(maxsize=cache_size, ttl=default_ttl_seconds),
+        default_ttl_seconds=default_ttl_seconds,
+        freshness_ttl_seconds=freshness_ttl_seconds or {},
+    )
+
+
+@functools.cache
+def get_web_search_tool() -> CachedWebSearch:
+    """Returns the process-wide cached Tavily search tool configured in agent.yaml."""
+    config = read_web_search_config()
+    return create_web_search_tool(
+        max_results=config.max_results,
+        cache_size=config.cache_size,
+        default_ttl_seconds=config.default_ttl_seconds,
+        freshness_ttl_seconds=config.freshness_ttl_seconds,
+    )
@@ -0,0 +1,229 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from models.config import AdmissionLimitsConfig
+from utils.config import read_admission_config
+from utils.metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    QUEUE_WAIT,
+)
+
+
+# Configure logger
+logger = logging.getLogger("backend.utils.admission")
+
+# lower values are served first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+DEFAULT_PRIORITY = PRIORITIES["normal"]
+# weight of the latest generation in the running average used for Retry-After
+SERVICE_TIME_SMOOTHING = 0.2
+
+# one controller per model, shared by every agent and conversation
+_controllers: dict[str, "AdmissionController"] = {}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a model is saturated, `retry_after` is a hint in whole seconds.
+
+    A full queue maps to 429, a wait that outlasted max_wait_seconds to 503.
+    """
+
+    def __init__(self, model_name: str, reason: str, retry_after: int):
+        super().__init__(
+            f"The model {model_name} is busy ({reason}), retry in {retry_after}s"
+        )
+        self.model_name = model_name
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def status_code(self) -> int:
+        return 503 if self.reason == "timeout" else 429
+
+
+class AdmissionController:
+    """Bounds the concurrent generations on one model.
+
+    Up to max_in_flight generations run at once, the next max_queue wait for a slot in
+    priority order and give up after max_wait_seconds. When the queue is full a request
+    displaces the latest waiter of a lower priority or is rejected right away.
+    """
+
+    def __init__(self, model_name: str, limits: AdmissionLimitsConfig):
+        self.model_name = model_name
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        # running average of the time a slot is held, None until the first release
+        self.service_seconds: float | None = None
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self.configure(limits)
+
+    def configure(self, limits: AdmissionLimitsConfig) -> None:
+        """Applies new limits, running generations finish and extra slots go to waiters."""
+        self.limits = limits
+        self.max_in_flight = limits.max_in_flight
+        self.max_queue = limits.max_queue
+        self.max_wait_seconds = limits.max_wait_seconds
+        self._admit_waiters()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Estimates the seconds until a new request would get a slot."""
+        service = self.service_seconds or 1.0
+        return max(1, math.ceil(service * (self.queued + 1) / self.max_in_flight))
+
+    def check(self, priority: int = DEFAULT_PRIORITY) -> None:
+        """Raises AdmissionRejected if a request of this priority would be turned away now.
+
+        Reserves nothing, it lets endpoints answer 429 before a response has started.
+        """
+        if self.in_flight < self.max_in_flight or self.queued < self.max_queue:
+            return
+        worst = self._worst_waiter()
+        if worst is None or worst[0] <= priority:
+            raise self._reject("queue_full")
+
+    async def acquire(self, priority: int = DEFAULT_PRIORITY) -> None:
+        """Waits for a slot, raises AdmissionRejected when there is none in time."""
+        start = time.perf_counter()
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self._admitted(start)
+            return
+
+        if self.queued >= self.max_queue:
+            worst = self._worst_waiter()
+            if worst is None or worst[0] <= priority:
+                raise self._reject("queue_full")
+            self._discard(worst)
+            worst[2].set_exception(self._reject("displaced"))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._order), future)
+        heapq.heappush(self._waiters, entry)
+        self._update_gauges()
+        try:
+            async with asyncio.timeout(self.max_wait_seconds):
+                # release() hands its slot over by resolving the future
+                await future
+        except BaseException as e:
+            if not self._discard(entry) and future.done() and not future.cancelled():
+                if future.exception() is None:
+                    # the slot was handed over just as the wait ended
+                    self.release()
+            if isinstance(e, TimeoutError):
+                raise self._reject("timeout") from None
+            raise
+        self._admitted(start)
+
+    def release(self, held_seconds: float | None = None) -> None:
+        """Frees a slot, handing it to the first waiter."""
+        if held_seconds is not None:
+            if self.service_seconds is None:
+                self.service_seconds = held_seconds
+            else:
+                self.service_seconds += SERVICE_TIME_SMOOTHING * (
+                    held_seconds - self.service_seconds
+                )
+        self.in_flight -= 1
+        self._admit_waiters()
+
+    @asynccontextmanager
+    async def admit(self, priority: int = DEFAULT_PRIORITY) -> AsyncIterator[None]:
+        """Holds a slot for the duration of the block."""
+        await self.acquire(priority)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_service_seconds": round(self.service_seconds or 0.0, 3),
+        }
+
+    def _admit_waiters(self) -> None:
+        while self._waiters and self.in_flight < self.max_in_flight:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+        self._update_gauges()
+
+    def _admitted(self, start: float) -> None:
+        self.admitted += 1
+        QUEUE_WAIT.labels(f"model:{self.model_name}").observe(time.perf_counter() - start)
+        self._update_gauges()
+
+    def _worst_waiter(self) -> tuple[int, int, asyncio.Future] | None:
+        # lowest priority, latest arrival
+        return max(self._waiters, default=None)
+
+    def _discard(self, entry: tuple[int, int, asyncio.Future]) -> bool:
+        try:
+            self._waiters.remove(entry)
+        except ValueError:
+            return False
+        heapq.heapify(self._waiters)
+        self._update_gauges()
+        return True
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.rejected += 1
+        ADMISSION_REJECTED.labels(self.model_name, reason).inc()
+        retry_after = self.retry_after()
+        logger.warning(
+            "Rejected generation on %s (%s), %d in flight, %d queued, retry after %ds",
+            self.model_name,
+            reason,
+            self.in_flight,
+            self.queued,
+            retry_after,
+        )
+        return AdmissionRejected(self.model_name, reason, retry_after)
+
+    def _update_gauges(self) -> None:
+        ADMISSION_IN_FLIGHT.labels(self.model_name).set(self.in_flight)
+        ADMISSION_QUEUE_DEPTH.labels(self.model_name).set(self.queued)
+
+
+def get_admission_controller(
+    model_name: str, default_max_in_flight: int | None = None
+) -> AdmissionController:
+    """Returns the model's controller with its current limits from the config.
+
+    `default_max_in_flight` applies when the config has no override for the model,
+    e.g. the vision model's max_concurrency.
+    """
+    limits = read_admission_config().limits_for(model_name, default_max_in_flight)
+    controller = _controllers.get(model_name)
+    if controller is None:
+        controller = _controllers[model_name] = AdmissionController(model_name, limits)
+    elif controller.limits != limits:
+        logger.info("Admission limits for %s changed to %s", model_name, limits)
+        controller.configure(limits)
+    return controller
+
+
+def admission_stats() -> dict[str, dict[str, int | float]]:
+    """Returns the slot and queue counters of every model seen so far."""
+    return {name: controller.stats() for name, controller in _controllers.items()}
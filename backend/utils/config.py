@@ -1,26 +1,56 @@
+import copy
 import logging
+import os
+import stat
+import tempfile
+import threading
 import yaml
-from models.config import ModelConfig
+from pydantic import BaseModel, ValidationError
+from models.config import (
+    AdmissionConfig,
+    HistoryConfig,
+    ImageProcessingConfig,
+    ImageStoreConfig,
+    LLMCacheConfig,
+    LoggingConfig,
+    MemoryConfig,
+    ModelConfig,
+    OllamaConfig,
+    RoutingConfig,
+    ToolLLMConfig,
+    ToolExecutionConfig,
+    VisionLLMConfig,
+    WeatherConfig,
+    WebSearchConfig,
+)
 from pathlib import Path
+from typing import Any, Callable, TypeVar
 
 
 # Configure logger
 logger = logging.getLogger("backend.utils.config")
 CONFIG_PATH = Path("config/agent.yaml")
 
+SectionModel = TypeVar("SectionModel", bound=BaseModel)
+T = TypeVar("T")
 
-def load_yaml_config() -> dict[str, any]:
-    """Loads and parses the YAML config file."""
+# the parsed file and everything derived from it, invalidated when the file's mtime or size changes
+_config_lock = threading.RLock()
+_config_stamp: tuple[int, int] | None = None
+_config_raw: dict[str, Any] = {}
+_config_derived: dict[str, Any] = {}
+
+
+def _parse_config_file() -> dict[str, Any]:
     logger.debug("Loading YAML config from %s", CONFIG_PATH)
-    
-    if not CONFIG_PATH.exists():
-        logger.error("Config file not found at %s", CONFIG_PATH)
-        raise FileNotFoundError("Missing config file at 'config/agent.yaml'.")
 
     try:
         with open(CONFIG_PATH, "r") as f:
             config = yaml.safe_load(f) or {}
         logger.info("Config file loaded successfully")
+    except FileNotFoundError:
+        logger.error("Config file not found at %s", CONFIG_PATH)
+        raise FileNotFoundError("Missing config file at 'config/agent.yaml'.")
     except yaml.YAMLError as e:
         logger.error("Failed to parse YAML config: %s", e)
         raise ValueError(f"Failed to parse YAML: {e}")
@@ -31,19 +61,65 @@ def load_yaml_config() -> dict[str, any]:
     return config
 
 
+def _load_cached_config() -> dict[str, Any]:
+    """Returns the parsed config, re-parsing only when the file changed on disk.
+
+    The returned dict is shared, callers must not mutate it.
+    """
+    global _config_stamp, _config_raw
+
+    with _config_lock:
+        try:
+            stat = CONFIG_PATH.stat()
+        except FileNotFoundError:
+            logger.error("Config file not found at %s", CONFIG_PATH)
+            raise FileNotFoundError("Missing config file at 'config/agent.yaml'.")
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != _config_stamp:
+            _config_raw = _parse_config_file()
+            _config_derived.clear()
+            _config_stamp = stamp
+        return _config_raw
+
+
+def _cached(key: str, build: Callable[[dict[str, Any]], T]) -> T:
+    """Builds a value from the parsed config once per version of the file."""
+    with _config_lock:
+        config = _load_cached_config()
+        if key not in _config_derived:
+            _config_derived[key] = build(config)
+        return _config_derived[key]
+
+
+def invalidate_config_cache() -> None:
+    global _config_stamp
+    with _config_lock:
+        _config_stamp = None
+        _config_derived.clear()
+
+
+def load_yaml_config() -> dict[str, Any]:
+    """Loads and parses the YAML config file, returning a copy the caller may modify."""
+    return copy.deepcopy(_load_cached_config())
+
+
 def read_config() -> ModelConfig:
-    """Reads and validates the agent config file, returning a ModelConfig."""
+    """Reads and validates the agent config file, returning a cached, frozen ModelConfig."""
+    return _cached("model", _build_model_config)
+
+
+def _build_model_config(config: dict[str, Any]) -> ModelConfig:
     logger.info("Reading agent configuration")
-    config = load_yaml_config()
 
     try:
         tool_llm = config["llm_config"]["tool_llm"]
         vision_llm = config["llm_config"]["vision_llm"]
         tool_model = f"{tool_llm['provider']}:{tool_llm['name']}"
         vision_model = f"{vision_llm['provider']}:{vision_llm['name']}"
-        tools_config = config["tools"]
-        
-        logger.debug("Config values - Tool model: %s, Vision model: %s", 
+        tools_config = dict(config["tools"])
+
+        logger.debug("Config values - Tool model: %s, Vision model: %s",
                     tool_model, vision_model)
 
     except KeyError as e:
@@ -57,14 +133,139 @@ def read_config() -> ModelConfig:
     return model_config
 
 
+def _read_optional_section(section: str, model: type[SectionModel]) -> SectionModel:
+    """Reads an optional top-level section of the config file, falling back to the model's defaults."""
+
+    def build(config: dict[str, Any]) -> SectionModel:
+        try:
+            section_config = model(**(config.get(section) or {}))
+        except ValidationError as e:
+            logger.error("Invalid %s config: %s", section, e)
+            raise ValueError(f"Invalid {section} config: {e}")
+
+        logger.debug("%s config: %s", section, section_config)
+        return section_config
+
+    return _cached(f"section:{section}", build)
+
+
+def read_memory_config() -> MemoryConfig:
+    """Reads the conversation memory limits."""
+    return _read_optional_section("memory", MemoryConfig)
+
+
+def read_history_config() -> HistoryConfig:
+    """Reads the prompt history budget and summarization settings."""
+    return _read_optional_section("history", HistoryConfig)
+
+
+def read_image_store_config() -> ImageStoreConfig:
+    """Reads the uploaded image store settings."""
+    return _read_optional_section("images", ImageStoreConfig)
+
+
+def read_image_processing_config() -> ImageProcessingConfig:
+    """Reads the image preprocessing settings applied before vision calls."""
+    return _read_optional_section("image_processing", ImageProcessingConfig)
+
+
+def read_weather_config() -> WeatherConfig:
+    """Reads the weather tool's HTTP and cache settings."""
+    return _read_optional_section("weather", WeatherConfig)
+
+
+def read_web_search_config() -> WebSearchConfig:
+    """Reads the web search tool's result count and cache settings."""
+    return _read_optional_section("web_search", WebSearchConfig)
+
+
+def read_ollama_config() -> OllamaConfig:
+    """Reads the Ollama server connection settings."""
+    return _read_optional_section("ollama", OllamaConfig)
+
+
+def read_tool_execution_config() -> ToolExecutionConfig:
+    """Reads the tool call timeouts and concurrency limits."""
+    return _read_optional_section("tool_execution", ToolExecutionConfig)
+
+
+def read_admission_config() -> AdmissionConfig:
+    """Reads the per-model generation limits and queueing settings."""
+    return _read_optional_section("admission", AdmissionConfig)
+
+
+def read_routing_config() -> RoutingConfig:
+    """Reads the model routes and the rules choosing between them."""
+    return _read_optional_section("routing", RoutingConfig)
+
+
+def read_llm_cache_config() -> LLMCacheConfig:
+    """Reads the LLM response cache mode and storage settings."""
+    return _read_optional_section("llm_cache", LLMCacheConfig)
+
+
+def read_logging_config() -> LoggingConfig:
+    """Reads the log redaction and sampling settings."""
+    return _read_optional_section("logging", LoggingConfig)
+
+
+def read_tool_llm_config() -> ToolLLMConfig:
+    """Reads the tool model's runtime settings from llm_config.tool_llm."""
+    return _cached("tool_llm", _build_tool_llm_config)
+
+
+def _build_tool_llm_config(config: dict[str, Any]) -> ToolLLMConfig:
+    try:
+        tool_llm_config = ToolLLMConfig(**config["llm_config"]["tool_llm"])
+    except KeyError as e:
+        logger.error("Missing required config key: %s", e)
+        raise ValueError(f"Missing required config key: {e}")
+    except ValidationError as e:
+        logger.error("Invalid tool_llm config: %s", e)
+        raise ValueError(f"Invalid tool_llm config: {e}")
+
+    logger.debug("Tool LLM config: %s", tool_llm_config)
+    return tool_llm_config
+
+
+def read_vision_llm_config() -> VisionLLMConfig:
+    """Reads the vision model's runtime settings from llm_config.vision_llm."""
+    return _cached("vision_llm", _build_vision_llm_config)
+
+
+def _build_vision_llm_config(config: dict[str, Any]) -> VisionLLMConfig:
+    try:
+        vision_llm_config = VisionLLMConfig(**config["llm_config"]["vision_llm"])
+    except KeyError as e:
+        logger.error("Missing required config key: %s", e)
+        raise ValueError(f"Missing required config key: {e}")
+    except ValidationError as e:
+        logger.error("Invalid vision_llm config: %s", e)
+        raise ValueError(f"Invalid vision_llm config: {e}")
+
+    logger.debug("Vision LLM config: %s", vision_llm_config)
+    return vision_llm_config
+
+
 def update_config(
     tool_model_name: str, vision_model_name: str, tool_config: dict[str, bool]
 ) -> None:
-    """Updates the tool and vision model names in the config file."""
-    logger.info("Updating configuration - Tool model: %s, Vision model: %s", 
+    """Updates the tool and vision model names in the config file.
+
+    The read-modify-write is serialized by a lock and the file is replaced atomically,
+    so concurrent readers see either the old or the new file, never a partial one.
+    """
+    logger.info("Updating configuration - Tool model: %s, Vision model: %s",
                 tool_model_name, vision_model_name)
     logger.debug("Tool config: %s", tool_config)
-    
+
+    with _config_lock:
+        _update_config_locked(tool_model_name, vision_model_name, tool_config)
+
+
+def _update_config_locked(
+    tool_model_name: str, vision_model_name: str, tool_config: dict[str, bool]
+) -> None:
     config = load_yaml_config()
 
     try:
@@ -77,9 +278,24 @@ def update_config(
         raise ValueError(f"Missing required structure in config file: {e}")
 
     try:
-        with open(CONFIG_PATH, "w") as f:
-            yaml.dump(config, f, default_flow_style=False, sort_keys=False)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=CONFIG_PATH.parent, prefix=f".{CONFIG_PATH.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                yaml.dump(config, f, default_flow_style=False, sort_keys=False)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates the file owner-only, keep the config's permissions
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(CONFIG_PATH).st_mode))
+            os.replace(tmp_path, CONFIG_PATH)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
         logger.info("Configuration updated and saved successfully")
     except IOError as e:
         logger.error("Failed to write updated config: %s", e)
         raise IOError(f"Failed to write updated config: {e}")
+    finally:
+        # the new file may share mtime and size with the old one on coarse clocks
+        invalidate_config_cache()
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, TypeVar
+from fastapi import Request
+
+
+# Configure logger
+logger = logging.getLogger("backend.utils.disconnect")
+
+DISCONNECT_POLL_SECONDS = 0.5
+
+T = TypeVar("T")
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def cancel_task(task: asyncio.Task) -> None:
+    """Cancels the task and waits for its cleanup to finish.
+
+    Waits with asyncio.wait rather than awaiting the task, so a cancellation of the
+    caller (Starlette cancels the response repeatedly) is not forwarded into the
+    task and its cleanup, e.g. LangGraph cancelling the running nodes, completes.
+    """
+    if task.done():
+        return
+    task.cancel()
+    await asyncio.wait({task})
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("Cancelled task failed during cleanup: %r", task.exception())
+
+
+async def run_until_disconnected(
+    request: Request,
+    awaitable: Awaitable[T],
+    poll_seconds: float = DISCONNECT_POLL_SECONDS,
+) -> T:
+    """Awaits the work in its own task, cancelling it when the client disconnects.
+
+    Raises ClientDisconnected once the cancelled work has cleaned up.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("Client disconnected from %s, cancelling", request.url.path)
+                await cancel_task(task)
+                raise ClientDisconnected()
+    finally:
+        await cancel_task(task)
+
+
+async def iterate_until_disconnected(
+    request: Request,
+    events: AsyncIterator[T],
+    poll_seconds: float = DISCONNECT_POLL_SECONDS,
+) -> AsyncIterator[T]:
+    """Iterates the events in their own task, cancelling it when the client disconnects.
+
+    The response only notices a disconnect when a write fails, which can take long
+    while the model is thinking or a tool runs, so the connection is also checked
+    whenever no event arrived for `poll_seconds`. Closing this iterator cancels the
+    producer as well.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=64)
+    end = object()
+
+    async def produce() -> None:
+        # closing the events on cancellation stops the work behind them right away
+        async with aclosing(events):
+            async for event in events:
+                await queue.put(event)
+        await queue.put(end)
+
+    producer = asyncio.create_task(produce())
+    getter = None
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {getter, producer},
+                timeout=poll_seconds,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter in done:
+                event = getter.result()
+                if event is end:
+                    return
+                yield event
+                continue
+
+            getter.cancel()
+            if producer.done():
+                # failed before queueing the end marker
+                producer.result()
+            if await request.is_disconnected():
+                logger.info("Client disconnected from %s, cancelling", request.url.path)
+                raise ClientDisconnected()
+    finally:
+        if getter is not None:
+            getter.cancel()
+        await cancel_task(producer)
@@ -0,0 +1,220 @@
+import asyncio
+import base64
+import binascii
+import functools
+import hashlib
+import io
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from PIL import Image, ImageOps, UnidentifiedImageError
+from models.config import ImageProcessingConfig
+from utils.cache import MISSING, SingleFlight, TTLCache
+from utils.config import read_image_processing_config
+from utils.metrics import IMAGE_PROCESSING
+
+
+# Configure logger
+logger = logging.getLogger("backend.utils.image_processing")
+
+# formats vision models accept as is, anything else is re-encoded
+PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png"}
+# leading bytes of common image formats, for when processing is disabled
+SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+DEFAULT_MIME_TYPE = "image/jpeg"
+EXIF_ORIENTATION = 0x0112
+
+_pool: ProcessPoolExecutor | None = None
+_single_flight = SingleFlight()
+
+
+class ImageProcessingError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class ProcessedImage:
+    data: str  # base64
+    mime_type: str
+    width: int
+    height: int
+    # detected by decoding, e.g. "WEBP" for a WebP upload
+    source_format: str
+
+
+def detect_mime_type(image_data: str) -> str:
+    """Guesses the MIME type from the first bytes of a base64 image without decoding it."""
+    try:
+        head = base64.b64decode(image_data[:24])
+    except (binascii.Error, ValueError):
+        return DEFAULT_MIME_TYPE
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime_type in SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return DEFAULT_MIME_TYPE
+
+
+def normalize_image(image_data: str, max_edge: int, jpeg_quality: int) -> ProcessedImage:
+    """Decodes, orients and downscales a base64 image, re-encoding it only when needed.
+
+    Runs in a worker process. JPEG and PNG images that are upright and within
+    `max_edge` are returned unchanged. Everything else is re-encoded as JPEG, or as PNG
+    when it has transparency.
+    """
+    try:
+        raw = base64.b64decode(image_data, validate=True)
+        image = Image.open(io.BytesIO(raw))
+        source_format = image.format or "UNKNOWN"
+        source_size = image.size
+        # JPEG can decode at a fraction of the size directly, much cheaper than resizing
+        image.draft("RGB", (max_edge, max_edge))
+        rotated = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+        image = ImageOps.exif_transpose(image)
+    except UnidentifiedImageError:
+        raise ImageProcessingError("Not an image or an unsupported image format") from None
+    except (binascii.Error, ValueError, OSError, Image.DecompressionBombError) as e:
+        raise ImageProcessingError(f"Unreadable image: {e}") from None
+
+    if source_format in PASSTHROUGH_FORMATS and not rotated and max(source_size) <= max_edge:
+        return ProcessedImage(
+            image_data, PASSTHROUGH_FORMATS[source_format], *source_size, source_format
+        )
+
+    transparent = image.has_transparency_data
+    if image.mode not in ("RGB", "RGBA", "L"):
+        # palette and other modes only resize with nearest neighbour
+        image = image.convert("RGBA" if transparent else "RGB")
+    image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    if transparent:
+        image.save(output, format="PNG")
+        mime_type = "image/png"
+    else:
+        image.convert("RGB").save(output, format="JPEG", quality=jpeg_quality)
+        mime_type = "image/jpeg"
+    return ProcessedImage(
+        base64.b64encode(output.getvalue()).decode("ascii"),
+        mime_type,
+        *image.size,
+        source_format,
+    )
+
+
+@functools.cache
+def get_image_cache() -> TTLCache:
+    config = read_image_processing_config()
+    return TTLCache(maxsize=config.cache_size, ttl=config.cache_ttl_seconds)
+
+
+def get_image_pool(config: ImageProcessingConfig) -> ProcessPoolExecutor:
+    """Returns the shared worker pool, started on first use."""
+    global _pool
+    if _pool is None:
+        # forking a process running the event loop's threads is unsafe, forkserver
+        # starts workers from a clean process
+        method = (
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else "spawn"
+        )
+        _pool = ProcessPoolExecutor(
+            max_workers=config.max_workers,
+            mp_context=multiprocessing.get_context(method),
+        )
+    return _pool
+
+
+def reset_image_pool(pool: ProcessPoolExecutor) -> None:
+    """Drops a broken pool, the next get_image_pool starts a fresh one.
+
+    Jobs that were already waiting on the old pool fail with it, only the pool that
+    broke is dropped so they don't discard a fresh one.
+    """
+    global _pool
+    if _pool is pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def close_image_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def normalize_in_pool(
+    image_data: str, max_edge: int, config: ImageProcessingConfig
+) -> ProcessedImage:
+    """Runs normalize_image in the worker pool, restarting the pool once if it broke.
+
+    A worker that dies, e.g. killed for running out of memory on a huge image, breaks
+    the whole pool. Raises ImageProcessingError when the fresh pool breaks as well.
+    """
+    for attempt in range(1, 3):
+        pool = get_image_pool(config)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                pool, normalize_image, image_data, max_edge, config.jpeg_quality
+            )
+        except BrokenProcessPool:
+            logger.warning("Image worker pool broke, restarting it (attempt %d)", attempt)
+            reset_image_pool(pool)
+    raise ImageProcessingError("The image could not be processed, a worker crashed")
+
+
+async def prepare_image(image_data: str, model_name: str) -> ProcessedImage:
+    """Returns the image as the vision model should receive it.
+
+    Results are cached by content hash and the model's settings, so asking about the
+    same image again skips the work, and concurrent requests for it share one job.
+    Raises ImageProcessingError for data that is not a readable image, or when the
+    workers keep crashing on it.
+    """
+    config = read_image_processing_config()
+    if not config.enabled:
+        return ProcessedImage(image_data, detect_mime_type(image_data), 0, 0, "UNKNOWN")
+
+    max_edge = config.max_edge_for(model_name)
+    # hashing a multi-megabyte payload releases the GIL, keep it off the event loop
+    digest = await asyncio.to_thread(
+        lambda: hashlib.sha256(image_data.encode("ascii", "ignore")).hexdigest()
+    )
+    key = (digest, max_edge, config.jpeg_quality)
+    cache = get_image_cache()
+    cached = cache.get(key)
+    if cached is not MISSING:
+        logger.debug("Image cache hit for %s", digest[:12])
+        return cached
+
+    async def process() -> ProcessedImage:
+        start = time.perf_counter()
+        image = await normalize_in_pool(image_data, max_edge, config)
+        seconds = time.perf_counter() - start
+        IMAGE_PROCESSING.labels(image.source_format).observe(seconds)
+        logger.info(
+            "Normalized %s image %s to %dx%d %s (%d -> %d base64 chars) in %.3fs",
+            image.source_format,
+            digest[:12],
+            image.width,
+            image.height,
+            image.mime_type,
+            len(image_data),
+            len(image.data),
+            seconds,
+        )
+        cache.set(key, image)
+        return image
+
+    return await _single_flight.do(key, process)
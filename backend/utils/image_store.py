@@ -0,0 +1,155 @@
+import base64
+import functools
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO
+from utils.config import read_image_store_config
+
+
+# Configure logger
+logger = logging.getLogger("backend.utils.image_store")
+
+CHUNK_SIZE = 1024 * 1024
+IMAGE_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class ImageTooLargeError(ValueError):
+    pass
+
+
+class ImageStore:
+    """Local content-addressed image store.
+
+    Images are written once under their SHA-256 digest, so uploading or asking about
+    the same image again does not create another copy. Only the digest travels
+    through graph state and checkpoints.
+
+    Every upload prunes the store: images unused for `max_age_seconds` are removed,
+    then the least recently used ones until the store fits `max_store_bytes`. Reading
+    an image counts as using it, so images of ongoing conversations stay.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int,
+        max_store_bytes: int | None = None,
+        max_age_seconds: float | None = None,
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_store_bytes = max_store_bytes
+        self.max_age_seconds = max_age_seconds
+        self.evictions = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, image_id: str) -> Path:
+        if not IMAGE_ID_PATTERN.match(image_id):
+            raise ValueError(f"Invalid image id: {image_id!r}")
+        return self.root / image_id
+
+    def exists(self, image_id: str) -> bool:
+        try:
+            return self.path(image_id).is_file()
+        except ValueError:
+            return False
+
+    def save(self, stream: BinaryIO) -> tuple[str, int, bool]:
+        """Streams bytes into the store, returning (image_id, size, created)."""
+        digest = hashlib.sha256()
+        size = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while chunk := stream.read(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ImageTooLargeError(
+                            f"Image exceeds the upload limit of {self.max_bytes} bytes"
+                        )
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            image_id = digest.hexdigest()
+            target = self.root / image_id
+            if target.exists():
+                logger.debug("Image %s already stored", image_id)
+                os.unlink(tmp_path)
+                os.utime(target)
+                return image_id, size, False
+
+            os.replace(tmp_path, target)
+            logger.info("Stored image %s (%d bytes)", image_id, size)
+            self.prune(keep=image_id)
+            return image_id, size, True
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def read_bytes(self, image_id: str) -> bytes:
+        path = self.path(image_id)
+        if not path.is_file():
+            raise FileNotFoundError(f"Image {image_id} not found")
+        data = path.read_bytes()
+        # the modification time doubles as the last use for pruning
+        os.utime(path)
+        return data
+
+    def prune(self, keep: str | None = None) -> int:
+        """Removes expired and least recently used images, returning how many were removed."""
+        if self.max_store_bytes is None and self.max_age_seconds is None:
+            return 0
+        images = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and IMAGE_ID_PATTERN.match(entry.name):
+                stat = entry.stat()
+                images.append((stat.st_mtime, stat.st_size, entry.name))
+        images.sort()
+
+        total = sum(size for _, size, _ in images)
+        deadline = time.time() - (self.max_age_seconds or float("inf"))
+        removed = 0
+        for last_used, size, image_id in images:
+            expired = last_used < deadline
+            over_budget = self.max_store_bytes is not None and total > self.max_store_bytes
+            if not (expired or over_budget):
+                break
+            if image_id == keep:
+                continue
+            try:
+                os.unlink(self.root / image_id)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            self.evictions += removed
+            logger.info("Pruned %d images, %d bytes stored", removed, total)
+        return removed
+
+    def read_base64(self, image_id: str) -> str:
+        """Returns the image as base64, the encoding model providers expect."""
+        return base64.b64encode(self.read_bytes(image_id)).decode("ascii")
+
+
+@functools.cache
+def get_image_store() -> ImageStore:
+    """Returns the process-wide image store configured in agent.yaml."""
+    config = read_image_store_config()
+    return ImageStore(
+        Path(config.store_dir),
+        int(config.max_upload_megabytes * 1024 * 1024),
+        max_store_bytes=int(config.max_store_megabytes * 1024 * 1024)
+        if config.max_store_megabytes is not None
+        else None,
+        max_age_seconds=config.max_age_days * 24 * 3600
+        if config.max_age_days is not None
+        else None,
+    )
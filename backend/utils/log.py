@@ -0,0 +1,167 @@
+import atexit
+import logging
+import logging.config
+import logging.handlers
+import queue
+import random
+from typing import Any
+from langchain_core.messages import BaseMessage
+from models.config import LoggingConfig
+
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# values of these keys are summarized rather than logged, message lists are the big ones
+SUMMARIZED_FIELDS = ("messages",)
+
+_listeners: list[logging.handlers.QueueListener] = []
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the records below WARNING from hot-path loggers.
+
+    Rates are keyed by logger name prefix and the longest matching prefix wins.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def rate_for(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(f"{prefix}."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+class RedactingFilter(logging.Filter):
+    """Shrinks log arguments before the message is formatted.
+
+    Redacted fields (image payloads) are replaced by their size, message lists by
+    their length and long strings are truncated, so a multi-megabyte state never
+    reaches the formatter or the handlers.
+    """
+
+    def __init__(self, max_chars: int, redact_fields: list[str]):
+        super().__init__()
+        self.max_chars = max_chars
+        self.redact_fields = set(redact_fields)
+
+    def shrink(self, value: Any, depth: int = 0) -> Any:
+        if isinstance(value, str):
+            if len(value) > self.max_chars:
+                return f"{value[: self.max_chars]}... [{len(value)} chars]"
+            return value
+        if isinstance(value, BaseMessage):
+            return f"{type(value).__name__}({self.shrink(str(value.content))!r})"
+        if isinstance(value, (dict, list, tuple)) and depth >= 2:
+            return f"<{type(value).__name__}>"
+        if isinstance(value, dict):
+            return {key: self.shrink_field(key, v, depth) for key, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            if len(value) > 20:
+                return f"<{type(value).__name__} of {len(value)} items>"
+            return type(value)(self.shrink(v, depth + 1) for v in value)
+        return value
+
+    def shrink_field(self, key: Any, value: Any, depth: int) -> Any:
+        if key in self.redact_fields and value:
+            size = len(value) if isinstance(value, (str, bytes)) else "?"
+            return f"<redacted {size} chars>"
+        if key in SUMMARIZED_FIELDS and isinstance(value, (list, tuple)):
+            return f"<{len(value)} {key}>"
+        return self.shrink(value, depth + 1)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Replaces `record.args` in place with the shrunk arguments.
+
+        The filter sits on the queue handler, so every handler behind the queue only
+        ever sees the shrunk args. Don't add one that needs the raw arguments.
+        """
+        if isinstance(record.args, dict):
+            record.args = self.shrink(record.args)
+        elif record.args:
+            record.args = tuple(self.shrink(arg) for arg in record.args)
+        return True
+
+
+def add_queue(logger: logging.Logger, filters: list[logging.Filter]) -> None:
+    """Moves the logger's handlers behind a queue drained by a background thread.
+
+    The calling thread still filters the record and formats it, QueueHandler.prepare()
+    merges the arguments into the message and renders any traceback before enqueueing.
+    What moves off it is the I/O: file writes, rotation and console output run on the
+    listener thread.
+    """
+    handlers = list(logger.handlers)
+    if not handlers:
+        return
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    for log_filter in filters:
+        queue_handler.addFilter(log_filter)
+
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+    _listeners.append(listener)
+
+
+def stop_logging() -> None:
+    """Flushes the queued records and stops the listener threads."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def setup_logging(
+    config_path: str = "config/logging.conf", config: LoggingConfig | None = None
+) -> logging.Logger:
+    """Configures logging from the config file and moves every handler behind a queue.
+
+    Falls back to a rotating app.log and the console when the file can't be loaded.
+    """
+    config = config or LoggingConfig()
+    error = None
+    try:
+        logging.config.fileConfig(config_path)
+        logger = logging.getLogger("backend")
+    except Exception as e:
+        error = e
+        logging.basicConfig(
+            level=logging.INFO,
+            format=FORMAT,
+            handlers=[
+                logging.handlers.RotatingFileHandler(
+                    "app.log", maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8"
+                ),
+                logging.StreamHandler(),
+            ],
+        )
+        logger = logging.getLogger(__name__)
+
+    filters = [
+        SamplingFilter(config.sample_rates),
+        RedactingFilter(config.max_field_chars, config.redact_fields),
+    ]
+    for named in [logging.root, *logging.root.manager.loggerDict.values()]:
+        # the dict also holds placeholders for names with only child loggers
+        if isinstance(named, logging.Logger):
+            add_queue(named, filters)
+    atexit.register(stop_logging)
+
+    if error is not None:
+        logger.warning(
+            "Failed to load logging configuration from file, using basic config: %s", error
+        )
+    return logger
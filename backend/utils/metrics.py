@@ -0,0 +1,117 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+from prometheus_client import Counter, Gauge, Histogram
+
+
+# local models answer in seconds to minutes, the default buckets stop at 10s
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+LLM_LATENCY = Histogram(
+    "vea_llm_request_seconds",
+    "Latency of LLM calls by kind: tool, vision or summary",
+    ["model", "kind"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Histogram(
+    "vea_llm_tokens",
+    "Tokens per LLM call as reported by the provider",
+    ["model", "direction"],
+    buckets=TOKEN_BUCKETS,
+)
+ROUTE_TURNS = Counter(
+    "vea_route_turns_total",
+    "Text turns sent to each route by the router",
+    ["route"],
+)
+ROUTE_LLM_LATENCY = Histogram(
+    "vea_route_llm_seconds",
+    "Latency of LLM calls per route",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+TOOL_LATENCY = Histogram(
+    "vea_tool_call_seconds",
+    "Latency of tool calls, including the wait for a concurrency slot",
+    ["tool"],
+    buckets=LATENCY_BUCKETS,
+)
+TOOL_CALLS = Counter(
+    "vea_tool_calls_total",
+    "Tool calls by outcome: success, error, timeout, cancelled or unknown_tool",
+    ["tool", "status"],
+)
+TOOL_ITERATIONS = Histogram(
+    "vea_tool_iterations_per_turn",
+    "Model responses with tool calls per conversation turn",
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13),
+)
+QUEUE_WAIT = Histogram(
+    "vea_queue_wait_seconds",
+    "Time spent waiting for a concurrency slot",
+    ["resource"],
+    buckets=LATENCY_BUCKETS,
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "vea_admission_in_flight",
+    "Generations running per model",
+    ["model"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "vea_admission_queue_depth",
+    "Generations waiting for a slot per model",
+    ["model"],
+)
+ADMISSION_REJECTED = Counter(
+    "vea_admission_rejected_total",
+    "Generations turned away by admission control: queue_full, displaced or timeout",
+    ["model", "reason"],
+)
+TOOL_OUTPUT_CHARS = Histogram(
+    "vea_tool_output_chars",
+    "Characters of tool results before (raw) and after (kept) projection and capping",
+    ["tool", "stage"],
+    buckets=(64, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536),
+)
+IMAGE_PROCESSING = Histogram(
+    "vea_image_processing_seconds",
+    "Time to normalize an image for the vision model, by detected format, cache hits excluded",
+    ["format"],
+    buckets=LATENCY_BUCKETS,
+)
+TURN_LATENCY = Histogram(
+    "vea_turn_seconds",
+    "End-to-end latency of a conversation turn",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+CANCELLED_TURNS = Counter(
+    "vea_cancelled_turns_total",
+    "Turns cancelled before completion, e.g. because the client disconnected",
+    ["endpoint"],
+)
+ACTIVE_CONVERSATIONS = Gauge(
+    "vea_active_conversations",
+    "Conversations with a turn in progress",
+)
+
+
+@contextmanager
+def track_turn(endpoint: str) -> Iterator[None]:
+    """Counts the turn as active and records its latency."""
+    ACTIVE_CONVERSATIONS.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        TURN_LATENCY.labels(endpoint).observe(time.perf_counter() - start)
+        ACTIVE_CONVERSATIONS.dec()
+
+
+def observe_usage(model: str, usage: dict | None) -> None:
+    """Records the prompt and completion token counts of a response's usage metadata."""
+    if not usage:
+        return
+    LLM_TOKENS.labels(model, "prompt").observe(usage.get("input_tokens", 0))
+    LLM_TOKENS.labels(model, "completion").observe(usage.get("output_tokens", 0))
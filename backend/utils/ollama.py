@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import httpx
+from utils.config import read_ollama_config
+
+
+# Configure logger
+logger = logging.getLogger("backend.utils.ollama")
+
+# model digest -> capabilities, a digest only changes when the model is re-pulled or re-created
+_capabilities_cache: dict[str, frozenset[str]] = {}
+_client: httpx.AsyncClient | None = None
+
+
+def get_ollama_base_url() -> str:
+    """Returns the Ollama server URL, OLLAMA_HOST takes precedence like it does for the ollama CLI."""
+    host = os.environ.get("OLLAMA_HOST") or read_ollama_config().base_url
+    if not host.startswith(("http://", "https://")):
+        host = f"http://{host}"
+    return host.rstrip("/")
+
+
+def get_ollama_client() -> httpx.AsyncClient:
+    """Returns the shared HTTP client for the Ollama API."""
+    global _client
+    if _client is None or _client.is_closed:
+        config = read_ollama_config()
+        _client = httpx.AsyncClient(
+            base_url=get_ollama_base_url(),
+            timeout=httpx.Timeout(config.timeout_seconds, connect=5),
+        )
+    return _client
+
+
+async def close_ollama_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def parse_capabilities(show: dict) -> frozenset[str]:
+    """Extracts model capabilities from an /api/show response.
+
+    Recent Ollama versions report them directly; older ones are inferred from the
+    projector (vision) and the chat template (tool calling).
+    """
+    if "capabilities" in show:
+        return frozenset(show["capabilities"] or [])
+
+    capabilities = {"completion"}
+    model_info = show.get("model_info") or {}
+    if show.get("projector_info") or any(".vision." in key for key in model_info):
+        capabilities.add("vision")
+    if ".Tools" in (show.get("template") or ""):
+        capabilities.add("tools")
+    return frozenset(capabilities)
+
+
+async def list_models() -> list[dict]:
+    """Lists installed models with their digests."""
+    response = await get_ollama_client().get("/api/tags")
+    response.raise_for_status()
+    return response.json().get("models", [])
+
+
+async def show_model(name: str) -> dict:
+    logger.debug("Fetching info for Ollama model: %s", name)
+    response = await get_ollama_client().post("/api/show", json={"model": name})
+    response.raise_for_status()
+    return response.json()
+
+
+async def get_model_capabilities() -> dict[str, frozenset[str]]:
+    """Returns the capabilities of every installed model.
+
+    Capabilities are cached per digest, so `show` only runs for models that were added
+    or changed since the last call, with at most `show_concurrency` requests at once.
+    """
+    models = await list_models()
+    semaphore = asyncio.Semaphore(read_ollama_config().show_concurrency)
+
+    async def capabilities_for(model: dict) -> frozenset[str]:
+        digest = model.get("digest")
+        if digest and digest in _capabilities_cache:
+            return _capabilities_cache[digest]
+
+        async with semaphore:
+            capabilities = parse_capabilities(await show_model(model["name"]))
+        if digest:
+            _capabilities_cache[digest] = capabilities
+        return capabilities
+
+    results = await asyncio.gather(*[capabilities_for(model) for model in models])
+    logger.debug(
+        "Resolved capabilities for %d models, %d cached digests",
+        len(models),
+        len(_capabilities_cache),
+    )
+    return {model["name"]: capabilities for model, capabilities in zip(models, results)}
+
+
+async def preload_model(
+    name: str, keep_alive: str | int, num_ctx: int | None = None
+) -> None:
+    """Loads a model into memory with a one-token generation and keeps it resident for `keep_alive`.
+
+    Pass the `num_ctx` later requests use, a different one makes Ollama load the model again.
+    """
+    logger.info(
+        "Preloading Ollama model %s (keep_alive=%s, num_ctx=%s)", name, keep_alive, num_ctx
+    )
+    options = {"num_predict": 1}
+    if num_ctx is not None:
+        options["num_ctx"] = num_ctx
+    response = await get_ollama_client().post(
+        "/api/generate",
+        json={
+            "model": name,
+            "prompt": "Hi",
+            "stream": False,
+            "keep_alive": keep_alive,
+            "options": options,
+        },
+        # loading a large model from disk can take minutes
+        timeout=httpx.Timeout(300, connect=5),
+    )
+    response.raise_for_status()
@@ -0,0 +1,70 @@
+import json
+import logging
+
+
+# Configure logger
+logger = logging.getLogger("backend.utils.streaming")
+
+THINK_OPEN_TAG = "<think>"
+THINK_CLOSE_TAG = "</think>"
+
+
+def format_sse(event: dict) -> str:
+    """Formats an agent stream event as a Server-Sent Events frame."""
+    event_type = event.get("type", "message")
+    payload = json.dumps(event, ensure_ascii=False, default=str)
+    return f"event: {event_type}\ndata: {payload}\n\n"
+
+
+class ThinkTagSplitter:
+    """Splits streamed LLM text into thinking and answer segments.
+
+    Reasoning models served through Ollama wrap their trace in <think>...</think>
+    tags inside the regular content. Tags may be split across chunks, so a small
+    tail is held back until we know whether it starts a tag.
+    """
+
+    def __init__(self):
+        self.in_think = False
+        self._buffer = ""
+
+    def feed(self, text: str) -> list[tuple[str, str]]:
+        """Returns a list of (kind, text) segments where kind is "thinking" or "token"."""
+        self._buffer += text
+        segments = []
+
+        while self._buffer:
+            tag = THINK_CLOSE_TAG if self.in_think else THINK_OPEN_TAG
+            kind = "thinking" if self.in_think else "token"
+            index = self._buffer.find(tag)
+
+            if index != -1:
+                if index > 0:
+                    segments.append((kind, self._buffer[:index]))
+                self._buffer = self._buffer[index + len(tag):]
+                self.in_think = not self.in_think
+                continue
+
+            # hold back a possible partial tag at the end of the buffer
+            hold = 0
+            for size in range(min(len(tag) - 1, len(self._buffer)), 0, -1):
+                if tag.startswith(self._buffer[-size:]):
+                    hold = size
+                    break
+
+            emit = self._buffer[: len(self._buffer) - hold]
+            if emit:
+                segments.append((kind, emit))
+            self._buffer = self._buffer[len(self._buffer) - hold:]
+            break
+
+        return segments
+
+    def flush(self) -> list[tuple[str, str]]:
+        """Returns whatever text is still buffered."""
+        if not self._buffer:
+            return []
+        kind = "thinking" if self.in_think else "token"
+        segments = [(kind, self._buffer)]
+        self._buffer = ""
+        return segments
@@ -1,13 +1,41 @@
-import { stripBase64Header } from "../utils/image";
-
 type AgentInput = {
     query: string;
     imageData?: string;
     webSearchEnabled?: boolean;
 };
 
+// one conversation per browser tab, the backend keeps a separate thread per session
+const sessionId = crypto.randomUUID();
+
+// carries the server's reason, e.g. the image is too large or not an image
+export class ImageUploadError extends Error {
+    constructor(message: string) {
+        super(message);
+        this.name = 'ImageUploadError';
+    }
+}
+
+// uploads the image as binary once, the chat request only carries its id
+const uploadImage = async (dataUrl: string): Promise<string> => {
+    const blob = await (await fetch(dataUrl)).blob();
+    const form = new FormData();
+    form.append('file', blob);
+    const response = await fetch('http://127.0.0.1:8000/images/', {
+        method: 'POST',
+        body: form,
+    });
+    if (!response.ok) {
+        const error = await response.json().catch(() => null);
+        throw new ImageUploadError(
+            `The image could not be uploaded: ${error?.detail ?? response.statusText}`
+        );
+    }
+    const data = await response.json();
+    return data.imageId;
+}
+
 export const callVeaAgent = async (input: AgentInput) => {
-    const image = input.imageData ? stripBase64Header(input.imageData) : "";
+    const imageId = input.imageData ? await uploadImage(input.imageData) : "";
     const response = await fetch('http://127.0.0.1:8000/chat', {
         method: 'POST',
         headers: {
@@ -15,7 +43,8 @@ export const callVeaAgent = async (input: AgentInput) => {
         },
         body: JSON.stringify({
             query: input.query,
-            imageData: image,
+            imageId,
+            sessionId,
             webSearchEnabled: input.webSearchEnabled ?? false,
         }),
     });
@@ -2,7 +2,7 @@ import { useState } from "react";
 import { v4 as uuidv4 } from 'uuid';
 import { Chat } from "@/components/Chat";
 import type { Message, ChatHistory } from "@/types/chat";
-import { callVeaAgent } from "@/api/chat";
+import { callVeaAgent, ImageUploadError } from "@/api/chat";
 
 const initialHistory: ChatHistory = {
   messages: [],
@@ -51,7 +51,9 @@ export default function ChatPage() {
       const errorMsg: Message = {
         id: uuidv4(),
         sender: "assistant",
-        content: "Something went wrong. Please try agian.",
+        content: error instanceof ImageUploadError
+          ? error.message
+          : "Something went wrong. Please try agian.",
         type: "text",
         timestamp: new Date(),
         image: null,